@@ -6,7 +6,8 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # The engine is imported lazily from functions; keep it listed explicitly.
+    hiddenimports=['rules'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -16,19 +17,18 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# onedir build: a onefile exe unpacks every bundled library to a temporary
+# directory on each launch, which dominated startup time.
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='MatchWise',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
     upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +36,12 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    name='MatchWise',
+)
@@ -0,0 +1,152 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from diagnostics import configure_logging, trace_rule
+from result_sink import open_sinks
+from rules import (LOCATION_COLUMN, RESULT_COLUMNS, available_cores, evaluate_rules, load_document, load_rules,
+                   load_test_data, result_rows, status_counts, write_results)
+
+DOCUMENT_EXTENSIONS = ('.pdf', '.docx')
+
+_plan = None
+
+def pairs_from_directory(directory):
+    """Pair every PDF/DOCX in ``directory`` with the JSON file of the same stem."""
+    pairs = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in DOCUMENT_EXTENSIONS:
+            continue
+        json_path = os.path.join(directory, stem + '.json')
+        if os.path.exists(json_path):
+            pairs.append((os.path.join(directory, name), json_path))
+    return pairs
+
+def pairs_from_manifest(manifest_path):
+    """Read ``(document, test_data)`` pairs from a CSV manifest or a JSON list.
+
+    Relative paths are resolved against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    if manifest_path.lower().endswith('.json'):
+        with open(manifest_path, 'r') as f:
+            entries = json.load(f)
+    else:
+        with open(manifest_path, 'r', newline='') as f:
+            entries = list(csv.DictReader(f))
+    return [(os.path.join(base, entry['document']), os.path.join(base, entry['test_data']))
+            for entry in entries]
+
+def load_pairs(source):
+    if os.path.isdir(source):
+        return pairs_from_directory(source)
+    return pairs_from_manifest(source)
+
+def output_path_for(doc_path, output_dir):
+    stem = os.path.splitext(os.path.basename(doc_path))[0]
+    return os.path.join(output_dir, f"{stem}_results.xlsx")
+
+def _init_worker(plan, log_level, traced_rule):
+    global _plan
+    _plan = plan
+    # Spawned workers start with default logging; carry the parent's over.
+    configure_logging(log_level, traced_rule)
+
+def _validate_one(doc_path, json_path, output_path, return_outcomes=False):
+    # Documents are already spread across processes; extract each serially.
+    document = load_document(doc_path, workers=1)
+    locations = [None] * len(_plan)
+    outcomes = evaluate_rules(_plan, document, load_test_data(json_path), locations=locations)
+    write_results(result_rows(_plan, outcomes, locations=locations), output_path,
+                  columns=RESULT_COLUMNS + [LOCATION_COLUMN])
+    counts = status_counts(outcomes)
+    if return_outcomes:
+        counts['outcomes'] = outcomes
+        counts['locations'] = locations
+    return counts
+
+def run_batch(plan, pairs, output_dir, workers=None, return_outcomes=False):
+    """Validate every ``(document, test_data)`` pair against ``plan`` in a
+    process pool, yielding one result dict per document as it finishes.
+
+    With ``return_outcomes`` each result also carries the document's
+    ``(status, reason)`` list and the rules' locations, e.g. for a
+    consolidated report.
+    """
+    workers = workers or available_cores()
+    os.makedirs(output_dir, exist_ok=True)
+    pairs = iter(pairs)
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(plan, logging.getLogger().level, trace_rule())) as pool:
+        def submit_next():
+            for doc_path, json_path in pairs:
+                output_path = output_path_for(doc_path, output_dir)
+                future = pool.submit(_validate_one, doc_path, json_path, output_path, return_outcomes)
+                in_flight[future] = (doc_path, json_path, output_path)
+                return True
+            return False
+
+        # Keep a bounded window of submissions so huge manifests don't sit
+        # in memory as pending futures.
+        while len(in_flight) < workers * 2 and submit_next():
+            pass
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                doc_path, json_path, output_path = in_flight.pop(future)
+                result = {'document': doc_path, 'test_data': json_path, 'output': output_path}
+                try:
+                    result.update(future.result())
+                except Exception as e:
+                    result['error'] = f"{type(e).__name__}: {e}"
+                yield result
+                submit_next()
+
+def combined_rows(plan, result):
+    for row in result_rows(plan, result['outcomes'], locations=result['locations']):
+        row["Document"] = result['document']
+        yield row
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate many documents against one rulebook.")
+    parser.add_argument('rules', help="rulebook Excel file")
+    parser.add_argument('source', help="directory of document/JSON pairs, or a CSV/JSON manifest "
+                                       "with 'document' and 'test_data' columns")
+    parser.add_argument('output_dir', help="directory for the per-document result workbooks")
+    parser.add_argument('--combined', nargs='+', default=None, metavar='PATH',
+                        help="also stream every document's results into one report (.xlsx, .csv or .jsonl)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: available cores)")
+    parser.add_argument('--log-level', default=None, help="logging level (default: $MATCHWISE_LOG_LEVEL or WARNING)")
+    parser.add_argument('--trace-rule', default=None, metavar='OUTPUT_IDENTIFIER',
+                        help="log every diagnostic for this one rule")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level, args.trace_rule)
+
+    plan = load_rules(args.rules)
+    combined = open_sinks(args.combined, ["Document"] + RESULT_COLUMNS + [LOCATION_COLUMN]) if args.combined else None
+    failures = 0
+    try:
+        for result in run_batch(plan, load_pairs(args.source), args.output_dir, args.workers,
+                                return_outcomes=combined is not None):
+            if 'error' in result:
+                failures += 1
+                print(f"{result['document']}: ERROR {result['error']}", flush=True)
+                continue
+            if combined is not None:
+                for row in combined_rows(plan, result):
+                    combined.write(row)
+            print(f"{result['document']}: PASS={result['PASS']} FAIL={result['FAIL']} "
+                  f"SKIPPED={result['SKIPPED']} -> {result['output']}", flush=True)
+    finally:
+        if combined is not None:
+            combined.close()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
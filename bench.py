@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import docx
+import fitz  # PyMuPDF
+import pandas as pd
+from docx.shared import Pt
+
+from rules import (InputValues, find_expected, load_document, load_rules, match_expected,
+                   prefilter_conditions, result_rows, write_results)
+
+STAGES = ('load_rules', 'load_rules_cached', 'extraction', 'extraction_cached', 'conditions', 'matching', 'style', 'report')
+
+PRODUCTS = ['ACCIDENT INSURANCE', 'CRITICAL ILLNESS', 'HOSPITAL INDEMNITY', 'GROUP LIFE']
+POLICYHOLDERS = ['DL Trust', 'AL Trust', 'National Group Benefit Trust']
+STATES = ['NY', 'NJ', 'CA', 'TX', 'FL']
+COVERAGE = ['Employee', 'Spouse', 'Child']
+WORDS = ('coverage begins at local time on the first of the month following the date you enroll '
+         'if during group enrollment event as described in section and agree to pay required premium '
+         'contributions any benefit amount payable for each covered accident injury').split()
+PLACEHOLDERS = ['PolicyNumber', 'AccountName', 'ProductName', 'Subscriber']
+STYLES = ['Style: Helvetica Size: 10', 'Style: Times Size: 10', 'Size: 10 Bold']
+
+LINES_PER_PAGE = 40
+
+def synthetic_test_data(rng):
+    return {
+        "AccountName": "Benchmark Account",
+        "Subscriber": "Benchmark Subscriber",
+        "ProductName": rng.choice(PRODUCTS),
+        "Policyholder": rng.choice(POLICYHOLDERS),
+        "State": rng.choice(STATES),
+        "PolicyNumber": f"GAI{rng.randrange(10**6):06d}",
+        "Coverage": sorted(rng.sample(COVERAGE, 2)),
+    }
+
+def _condition(rng):
+    kind = rng.random()
+    if kind < 0.4:
+        return f"ProductName={rng.choice(PRODUCTS)}"
+    if kind < 0.6:
+        return f'Policyholder="{rng.choice(POLICYHOLDERS)}"'
+    if kind < 0.8:
+        return f"State = {rng.choice(STATES)}"
+    return 'Coverage = ' + ', '.join(f'"{c}"' for c in rng.sample(COVERAGE, rng.randint(1, 2)))
+
+def synthetic_rules(n_rules, rng):
+    rows = []
+    for i in range(n_rules):
+        conditions = [_condition(rng) for _ in range(rng.choice((0, 1, 1, 2)))]
+        words = rng.sample(WORDS, rng.randint(6, 14))
+        if rng.random() < 0.4:
+            words.insert(rng.randrange(len(words)), f"<{rng.choice(PLACEHOLDERS)}>")
+        rows.append({
+            "Output Identifier": f"SYN{i}",
+            "Input Value": '; '.join(conditions) if conditions else "Static Text",
+            "Output Language": f"{i}. " + ' '.join(words).capitalize() + '.',
+            "Style": rng.choice(STYLES) if rng.random() < 0.3 else "",
+        })
+    return pd.DataFrame(rows)
+
+def document_lines(rules_df, input_data, n_pages, rng, hit_rate=0.7):
+    """Rendered Output Language for a share of the rules, padded with filler."""
+    lines = []
+    for text in rules_df["Output Language"]:
+        if rng.random() < hit_rate:
+            for key in PLACEHOLDERS:
+                text = text.replace(f"<{key}>", str(input_data[key]))
+            lines.append(text)
+    slots = n_pages * LINES_PER_PAGE
+    lines = lines[:slots]
+    while len(lines) < slots:
+        lines.append(' '.join(rng.sample(WORDS, 10)))
+    rng.shuffle(lines)
+    return lines
+
+def write_pdf(path, lines):
+    doc = fitz.open()
+    for start in range(0, len(lines), LINES_PER_PAGE):
+        page = doc.new_page()
+        y = 40
+        for i, line in enumerate(lines[start:start + LINES_PER_PAGE]):
+            page.insert_text((36, y), line[:110], fontname="tiro" if i % 3 else "helv", fontsize=10)
+            y += 19
+    doc.save(path)
+    doc.close()
+
+def write_docx(path, lines):
+    doc = docx.Document()
+    for i, line in enumerate(lines):
+        run = doc.add_paragraph().add_run(line)
+        run.font.name = "Times New Roman" if i % 3 else "Helvetica"
+        run.font.size = Pt(10)
+        run.bold = i % 7 == 0
+        if i and i % LINES_PER_PAGE == 0:
+            doc.add_page_break()
+    doc.save(path)
+
+def _timed(timings, stage, func, *args, **kwargs):
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    timings.setdefault(stage, []).append(time.perf_counter() - start)
+    return value
+
+def run_case(workdir, n_rules, n_pages, fmt, repeat, seed):
+    rng = random.Random(seed)
+    input_data = synthetic_test_data(rng)
+    rules_df = synthetic_rules(n_rules, rng)
+    rule_path = os.path.join(workdir, f"rules_{n_rules}_{seed}.xlsx")
+    if not os.path.exists(rule_path):
+        rules_df.to_excel(rule_path, index=False)
+    doc_path = os.path.join(workdir, f"doc_{n_rules}_{n_pages}_{seed}.{fmt}")
+    lines = document_lines(rules_df, input_data, n_pages, rng)
+    (write_pdf if fmt == 'pdf' else write_docx)(doc_path, lines)
+    output_path = os.path.join(workdir, "results.xlsx")
+
+    timings = {}
+    counts = {}
+    for _ in range(repeat):
+        plan = _timed(timings, 'load_rules', load_rules, rule_path, use_cache=False)
+        load_rules(rule_path)
+        _timed(timings, 'load_rules_cached', load_rules, rule_path)
+        _timed(timings, 'extraction', load_document, doc_path, use_cache=False)
+        load_document(doc_path)
+        document = _timed(timings, 'extraction_cached', load_document, doc_path)
+
+        values = InputValues(input_data)
+        applicable, skipped = _timed(timings, 'conditions', prefilter_conditions, plan, values)
+        matched = _timed(timings, 'matching', find_expected, plan, document, input_data, applicable)
+
+        def check_styles():
+            results = [None] * len(plan)
+            for idx, outcome in skipped.items():
+                results[idx] = outcome
+            for rule, target, hits in matched:
+                results[rule.index] = match_expected(rule, document, target, hits)
+            return results
+        results = _timed(timings, 'style', check_styles)
+
+        _timed(timings, 'report', lambda: write_results(result_rows(plan, results), output_path))
+
+    for status, _ in results:
+        counts[status] = counts.get(status, 0) + 1
+    return {
+        "rules": n_rules,
+        "pages": n_pages,
+        "format": fmt,
+        "document_chars": len(document.text),
+        "counts": counts,
+        "stages": {stage: {"min": min(timings[stage]), "median": statistics.median(timings[stage])}
+                   for stage in STAGES},
+    }
+
+def compare(results, baseline, threshold):
+    """Return a description of every stage whose median got slower than
+    ``threshold`` times the matching baseline case."""
+    previous = {(c["rules"], c["pages"], c["format"]): c for c in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        old = previous.get((case["rules"], case["pages"], case["format"]))
+        if old is None:
+            continue
+        for stage, stats in case["stages"].items():
+            before = old["stages"].get(stage, {}).get("median")
+            if before and stats["median"] > before * threshold:
+                regressions.append(f"{case['format']} rules={case['rules']} pages={case['pages']} {stage}: "
+                                   f"{before:.4f}s -> {stats['median']:.4f}s")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the rule engine on synthetic rulebooks and documents.")
+    parser.add_argument('--rules', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="rulebook sizes to generate (default: 100 1000 10000)")
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 100], help="document page counts")
+    parser.add_argument('--format', nargs='+', choices=('pdf', 'docx'), default=['pdf', 'docx'])
+    parser.add_argument('--repeat', type=int, default=3, help="timed repetitions per case")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--workdir', help="keep generated files here instead of a temporary directory")
+    parser.add_argument('--output', help="write JSON results here (default: stdout)")
+    parser.add_argument('--baseline', help="earlier JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="fail when a stage median exceeds the baseline by this factor")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        cases = []
+        for n_rules in args.rules:
+            for n_pages in args.pages:
+                for fmt in args.format:
+                    case = run_case(workdir, n_rules, n_pages, fmt, args.repeat, args.seed)
+                    print(f"{fmt} rules={n_rules} pages={n_pages}: " +
+                          ' '.join(f"{stage}={stats['median']:.4f}s" for stage, stats in case["stages"].items()),
+                          file=sys.stderr)
+                    cases.append(case)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "cases": cases,
+    }
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import logging
+import os
+
+LOG_LEVEL_ENV = 'MATCHWISE_LOG_LEVEL'
+TRACE_RULE_ENV = 'MATCHWISE_TRACE_RULE'
+
+_trace_rule = os.environ.get(TRACE_RULE_ENV) or None
+
+def set_trace_rule(identifier):
+    """Emit every diagnostic for the rule with this Output Identifier at INFO,
+    whatever the DEBUG setting; ``None`` switches tracing off."""
+    global _trace_rule
+    _trace_rule = None if identifier is None else str(identifier)
+
+def trace_rule():
+    return _trace_rule
+
+def active(logger):
+    """True when any per-rule diagnostics could be emitted by ``logger``."""
+    return _trace_rule is not None or logger.isEnabledFor(logging.DEBUG)
+
+def tracing(logger, rule_id):
+    """Return the level diagnostics for ``rule_id`` should use, or 0 when they
+    are disabled. Guard expensive argument construction with this."""
+    if _trace_rule is not None and str(rule_id) == _trace_rule:
+        return logging.INFO
+    if logger.isEnabledFor(logging.DEBUG):
+        return logging.DEBUG
+    return 0
+
+def trace(logger, rule_id, msg, *args):
+    """Log a per-rule diagnostic. Formatting happens only if it is emitted."""
+    level = tracing(logger, rule_id)
+    if level:
+        logger.log(level, msg, *args)
+
+def configure_logging(level=None, trace_rule=None, default='WARNING'):
+    """Set up console logging for the command-line entry points.
+
+    ``level`` defaults to $MATCHWISE_LOG_LEVEL, then ``default``;
+    ``trace_rule`` to $MATCHWISE_TRACE_RULE.
+    """
+    level = level or os.environ.get(LOG_LEVEL_ENV) or default
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if trace_rule is not None:
+        set_trace_rule(trace_rule)
+    if _trace_rule is not None:
+        level = min(level, logging.INFO)
+    logging.basicConfig(level=level, format='%(levelname)s %(name)s: %(message)s')
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_key(*parts):
+    return hashlib.sha256('\0'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+def touch(path):
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+def load_pickle(path):
+    try:
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, TypeError):
+        return None
+    touch(path)
+    return value
+
+def write_atomic(path, data):
+    directory = os.path.dirname(path)
+    # Cache folders are private: their entries are trusted when read back.
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def store_pickle(path, value, max_bytes):
+    try:
+        write_atomic(path, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        evict(os.path.dirname(path), max_bytes, keep=path)
+    except OSError:
+        # A read-only or full disk only costs us the cache, never the run.
+        pass
+
+def evict(directory, max_bytes, keep=None):
+    """Delete least recently used entries until ``directory`` fits in ``max_bytes``."""
+    entries = []
+    total = 0
+    with os.scandir(directory) as it:
+        for entry in it:
+            if not entry.is_file() or entry.name.startswith('.tmp-'):
+                continue
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.unlink(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,281 @@
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from near_match import NearMatchIndex
+
+_ALNUM_RUN = re.compile(r'[a-z0-9]+')
+_SPACE = re.compile(r'\s')
+
+def _owned(value):
+    # Columns mapped from the document cache are memoryviews; copy them into
+    # arrays so the object can be pickled, e.g. back from a worker process.
+    if isinstance(value, memoryview):
+        owned = array(value.format)
+        owned.frombytes(value.cast('B'))
+        return owned
+    return value
+
+def normalize_text(text):
+    text = text.lower()
+    text = re.sub(r'[^a-z0-9\s]', '', text)
+    return ' '.join(text.split())
+
+def _lower_with_index(text):
+    # str.lower() can expand a character (e.g. 'İ' -> 'i̇'), so keep a map
+    # from every lowered character back to the raw one it came from.
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered, None
+    chars = []
+    index = array('i')
+    for i, ch in enumerate(text):
+        low = ch.lower()
+        chars.append(low)
+        index.extend([i] * len(low))
+    return ''.join(chars), index
+
+def normalize_with_offsets(text):
+    """Return ``(normalized, offsets)`` where ``normalized == normalize_text(text)``
+    and ``offsets[i]`` is the position in ``text`` of ``normalized[i]``.
+
+    A collapsed space maps to the first raw character after the preceding word.
+    """
+    lowered, index = _lower_with_index(text)
+    parts = []
+    offsets = array('i')
+    prev_end = None
+    for m in _ALNUM_RUN.finditer(lowered):
+        start, end = m.span()
+        if prev_end is not None:
+            if _SPACE.search(lowered, prev_end, start):
+                parts.append(' ')
+                offsets.append(prev_end)
+        parts.append(m.group())
+        offsets.extend(range(start, end))
+        prev_end = end
+    if index is not None:
+        offsets = array('i', (index[i] for i in offsets))
+    return ''.join(parts), offsets
+
+class SpanIndex:
+    """Font data of every PDF text span, collected in the same pass as the text.
+
+    Spans are stored column-wise; ``page_starts[p]`` is the index of the first
+    span on page ``p``, ``page_offsets[p]`` the position of the page in the
+    document text and ``page_texts[p]`` the normalized text of the page's
+    spans joined by spaces.
+    """
+
+    def __init__(self):
+        self.starts = array('i')
+        self.texts = []
+        self.fonts = []
+        self.sizes = array('d')
+        self.flags = array('i')
+        self.page_starts = array('i')
+        self.page_offsets = array('i')
+        self.page_texts = []
+
+    def __len__(self):
+        return len(self.page_texts)
+
+    def __getstate__(self):
+        return {name: _owned(value) for name, value in self.__dict__.items()}
+
+    def add_page(self, page_dict, offset):
+        """Index one ``page.get_text("dict")`` result whose text starts at
+        ``offset`` in the document text, and return the page's plain text."""
+        self.page_starts.append(len(self.texts))
+        self.page_offsets.append(offset)
+        parts = []
+        span_texts = []
+        pos = offset
+        for block in page_dict["blocks"]:
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    text = span.get("text", "")
+                    self.starts.append(pos)
+                    self.texts.append(normalize_text(text))
+                    self.fonts.append(sys.intern(span.get("font", "").lower()))
+                    self.sizes.append(span.get("size", 0))
+                    self.flags.append(span.get("flags", 0))
+                    span_texts.append(text)
+                    parts.append(text)
+                    pos += len(text)
+                parts.append("\n")
+                pos += 1
+        self.page_texts.append(normalize_text(" ".join(span_texts)))
+        return "".join(parts)
+
+    def extend(self, other, offset):
+        """Append the pages of ``other``, whose text starts at ``offset``."""
+        base = len(self.texts)
+        self.starts.extend(start + offset for start in other.starts)
+        self.texts.extend(other.texts)
+        self.fonts.extend(sys.intern(font) for font in other.fonts)
+        self.sizes.extend(other.sizes)
+        self.flags.extend(other.flags)
+        self.page_starts.extend(start + base for start in other.page_starts)
+        self.page_offsets.extend(start + offset for start in other.page_offsets)
+        self.page_texts.extend(other.page_texts)
+
+    def page_spans(self, page):
+        end = self.page_starts[page + 1] if page + 1 < len(self.page_starts) else len(self.texts)
+        return range(self.page_starts[page], end)
+
+    def page_at(self, pos):
+        return bisect_right(self.page_offsets, pos) - 1
+
+    def spans_between(self, start, end):
+        """Spans overlapping ``[start, end)`` of the document text."""
+        return range(max(bisect_right(self.starts, start) - 1, 0), bisect_left(self.starts, end))
+
+class ParagraphIndex:
+    """Normalized text and resolved run styles of every DOCX paragraph.
+
+    ``runs`` holds one ``(font_name, font_size, bold)`` tuple per run, with
+    ``run_starts[p]`` the first run of paragraph ``p``.
+    """
+
+    def __init__(self):
+        self.starts = array('i')
+        self.texts = []
+        self.run_starts = array('i')
+        self.runs = []
+        self._joined = None
+        self._joined_starts = None
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getstate__(self):
+        return {name: _owned(value) for name, value in self.__dict__.items()}
+
+    def add_paragraph(self, offset, run_text, runs):
+        self.starts.append(offset)
+        self.texts.append(normalize_text(run_text))
+        self.run_starts.append(len(self.runs))
+        self.runs.extend(runs)
+        self._joined = None
+
+    def paragraph_at(self, pos):
+        return bisect_right(self.starts, pos) - 1
+
+    def paragraph_runs(self, para):
+        end = self.run_starts[para + 1] if para + 1 < len(self.run_starts) else len(self.runs)
+        return self.runs[self.run_starts[para]:end]
+
+    def find(self, target_clean):
+        """Index of the first paragraph whose normalized text contains
+        ``target_clean``, or None."""
+        joined = self._joined
+        if joined is None:
+            # Normalized text never contains a newline, so a match in the
+            # joined text always lies within a single paragraph. Threads may
+            # share the index: _joined is published last, once its starts exist.
+            joined = "\n".join(self.texts)
+            starts = array('i')
+            pos = 0
+            for text in self.texts:
+                starts.append(pos)
+                pos += len(text) + 1
+            self._joined_starts = starts
+            self._joined = joined
+        if not self.texts:
+            return None
+        pos = joined.find(target_clean)
+        if pos == -1:
+            return None
+        return bisect_right(self._joined_starts, pos) - 1
+
+class Location:
+    """Where a match sits: its ``[start, end)`` range in the raw text plus the
+    page and spans (PDF) or paragraph (DOCX) it lies within."""
+    __slots__ = ('start', 'end', 'page', 'paragraph', 'spans')
+
+    def __init__(self, start, end, page=None, paragraph=None, spans=None):
+        self.start = start
+        self.end = end
+        self.page = page
+        self.paragraph = paragraph
+        self.spans = spans
+
+    def __str__(self):
+        if self.page is not None:
+            return f"page {self.page + 1}"
+        if self.paragraph is not None:
+            return f"paragraph {self.paragraph + 1}"
+        return f"offset {self.start}"
+
+    def __repr__(self):
+        return f"Location({self.start}, {self.end}, page={self.page!r}, paragraph={self.paragraph!r})"
+
+class DocumentContext:
+    """Text of one document prepared once and shared by every rule evaluation."""
+
+    def __init__(self, path, text, spans=None, paragraphs=None):
+        self.path = path
+        self.text = text
+        self.normalized, self.offsets = normalize_with_offsets(text)
+        self.spans = spans
+        self.paragraphs = paragraphs
+        self._near_matches = None
+
+    def __getstate__(self):
+        # The near-match index is rebuilt on demand rather than shipped.
+        state = {name: _owned(value) for name, value in self.__dict__.items()}
+        state['_near_matches'] = None
+        return state
+
+    @classmethod
+    def prepared(cls, path, text, normalized, offsets, spans=None, paragraphs=None):
+        """Build a context from text that was already normalized, e.g. cached."""
+        self = cls.__new__(cls)
+        self.path = path
+        self.text = text
+        self.normalized = normalized
+        self.offsets = offsets
+        self.spans = spans
+        self.paragraphs = paragraphs
+        self._near_matches = None
+        return self
+
+    @property
+    def kind(self):
+        lower = self.path.lower()
+        if lower.endswith('.pdf'):
+            return 'pdf'
+        if lower.endswith('.docx'):
+            return 'docx'
+        return None
+
+    def near_match_index(self):
+        """NearMatchIndex of the normalized text, built on first use."""
+        if self._near_matches is None:
+            self._near_matches = NearMatchIndex(self.normalized)
+        return self._near_matches
+
+    def raw_span(self, start, end):
+        """Map a ``[start, end)`` range of the normalized text back to the raw text."""
+        return self.offsets[start], self.offsets[end - 1] + 1
+
+    def locate(self, hits, length):
+        """Location of the first match in ``hits`` (normalized start offsets
+        of ``length`` characters) lying within one page or paragraph, or None."""
+        if not length:
+            return None
+        for hit in hits:
+            start, end = self.raw_span(hit, hit + length)
+            if self.spans is not None:
+                page = self.spans.page_at(start)
+                if page == self.spans.page_at(end - 1):
+                    return Location(start, end, page=page, spans=self.spans.spans_between(start, end))
+            elif self.paragraphs is not None:
+                para = self.paragraphs.paragraph_at(start)
+                if para == self.paragraphs.paragraph_at(end - 1):
+                    return Location(start, end, paragraph=para)
+            else:
+                return Location(start, end)
+        return None
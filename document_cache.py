@@ -0,0 +1,127 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from disk_cache import evict, touch, write_atomic
+from document import DocumentContext, ParagraphIndex, SpanIndex
+
+# Bump whenever the section layout below changes.
+FORMAT_VERSION = 2
+
+MAGIC = b'MWDOC\n'
+_HEADER_LEN = struct.Struct('<Q')
+_ALIGN = 8
+_SEP = '\0'
+_NATIVE = [sys.byteorder, array('i').itemsize, array('d').itemsize]
+
+# Section name -> (object, attribute, storage kind) for each index type.
+_SPAN_SECTIONS = [
+    ('span_starts', 'starts', 'i'),
+    ('span_texts', 'texts', 'strings'),
+    ('span_fonts', 'fonts', 'strings'),
+    ('span_sizes', 'sizes', 'd'),
+    ('span_flags', 'flags', 'i'),
+    ('page_starts', 'page_starts', 'i'),
+    ('page_offsets', 'page_offsets', 'i'),
+    ('page_texts', 'page_texts', 'strings'),
+]
+_PARAGRAPH_SECTIONS = [
+    ('para_starts', 'starts', 'i'),
+    ('para_texts', 'texts', 'strings'),
+    ('run_starts', 'run_starts', 'i'),
+    ('runs', 'runs', 'json'),
+]
+
+def _encode(value, kind):
+    if kind == 'str':
+        return value.encode('utf-8')
+    if kind == 'strings':
+        return _SEP.join(value).encode('utf-8')
+    if kind == 'json':
+        return json.dumps(value).encode('utf-8')
+    return value.tobytes()
+
+def _decode(view, kind, count):
+    if kind == 'str':
+        return str(view, 'utf-8')
+    if kind == 'strings':
+        return str(view, 'utf-8').split(_SEP) if count else []
+    if kind == 'json':
+        return [tuple(run) for run in json.loads(str(view, 'utf-8'))]
+    # Numeric columns stay views into the mapping: no copy, paged in on use.
+    return view.cast(kind)
+
+def _sections(document):
+    yield 'text', document.text, 'str'
+    yield 'normalized', document.normalized, 'str'
+    yield 'offsets', document.offsets, 'i'
+    if document.spans is not None:
+        for name, attr, kind in _SPAN_SECTIONS:
+            yield name, getattr(document.spans, attr), kind
+    if document.paragraphs is not None:
+        for name, attr, kind in _PARAGRAPH_SECTIONS:
+            yield name, getattr(document.paragraphs, attr), kind
+
+def dump_document(document):
+    """Serialize ``document`` as a header followed by aligned raw sections."""
+    table = {}
+    chunks = []
+    pos = 0
+    for name, value, kind in _sections(document):
+        data = _encode(value, kind)
+        table[name] = [pos, len(data), kind, len(value)]
+        padding = -len(data) % _ALIGN
+        chunks.append(data + b'\0' * padding)
+        pos += len(data) + padding
+    header = json.dumps({'version': FORMAT_VERSION, 'native': _NATIVE, 'sections': table}).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + _HEADER_LEN.size + len(header)) % _ALIGN)
+    return b''.join([MAGIC, _HEADER_LEN.pack(len(header)), header] + chunks)
+
+def store_document(path, document, max_bytes):
+    try:
+        write_atomic(path, dump_document(document))
+        evict(os.path.dirname(path), max_bytes, keep=path)
+    except OSError:
+        pass
+
+def load_cached_document(path, doc_path):
+    """Map a cached document written by ``store_document``, or return None.
+
+    Text is decoded into strings; offsets and numeric span columns are
+    memoryviews over the mapping.
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        view = memoryview(mapped)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            return None
+        start = len(MAGIC) + _HEADER_LEN.size
+        (header_len,) = _HEADER_LEN.unpack(view[len(MAGIC):start])
+        header = json.loads(str(view[start:start + header_len], 'utf-8'))
+        if header.get('version') != FORMAT_VERSION or header.get('native') != _NATIVE:
+            return None
+        base = start + header_len
+        sections = {name: _decode(view[base + offset:base + offset + length], kind, count)
+                    for name, (offset, length, kind, count) in header['sections'].items()}
+    except (ValueError, KeyError, TypeError, UnicodeDecodeError, struct.error):
+        return None
+
+    spans = paragraphs = None
+    if 'span_starts' in sections:
+        spans = SpanIndex()
+        for name, attr, _ in _SPAN_SECTIONS:
+            setattr(spans, attr, sections[name])
+    if 'para_starts' in sections:
+        paragraphs = ParagraphIndex()
+        for name, attr, _ in _PARAGRAPH_SECTIONS:
+            setattr(paragraphs, attr, sections[name])
+    touch(path)
+    return DocumentContext.prepared(doc_path, sections['text'], sections['normalized'], sections['offsets'],
+                                    spans, paragraphs)
@@ -1,7 +1,35 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import time
+
+_STARTED = time.perf_counter()
+
+import multiprocessing
 import os
-from rule_engine import main as run_engine
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import filedialog, messagebox, ttk
+
+# Set to make the app report its startup time and exit once the window is up.
+STARTUP_PROBE_ENV = 'MATCHWISE_STARTUP_PROBE'
+# Documents validated at once when several are selected.
+MAX_CONCURRENT_DOCUMENTS = 4
+
+def prewarm():
+    # The engine pulls in pandas, openpyxl, fitz and docx. Import it in the
+    # background while the user picks files; the first validation then
+    # finds it loaded (or waits on the import lock for the rest).
+    try:
+        import rules  # noqa: F401
+    except Exception:
+        pass
+
+def run_engine(*args, **kwargs):
+    from rules import main
+    return main(*args, **kwargs)
+
+# How often the Tk loop drains worker events, in milliseconds.
+POLL_MS = 100
 
 class RuleEngineApp:
     def __init__(self, root):
@@ -9,13 +37,24 @@ class RuleEngineApp:
         self.root.title("Document Rule Validator")
 
         self.rule_path = None
-        self.doc_path = None
+        self.doc_paths = []
         self.json_path = None
+        self.events = queue.Queue()
+        self.cancel_event = None
+        self.progress = {}
+        self.outcomes = []
 
         tk.Button(root, text="Upload Rulebook (Excel)", command=self.upload_rule).pack(pady=5)
-        tk.Button(root, text="Upload Document (PDF/Word)", command=self.upload_doc).pack(pady=5)
+        tk.Button(root, text="Upload Documents (PDF/Word)", command=self.upload_doc).pack(pady=5)
         tk.Button(root, text="Upload JSON Input", command=self.upload_json).pack(pady=5)
-        tk.Button(root, text="Run Validation", command=self.run_validation).pack(pady=20)
+        self.run_button = tk.Button(root, text="Run Validation", command=self.run_validation)
+        self.run_button.pack(pady=(20, 5))
+        self.progress_bar = ttk.Progressbar(root, length=300, mode='determinate', maximum=100)
+        self.progress_bar.pack(padx=20, pady=5)
+        self.status = tk.Label(root, text="")
+        self.status.pack(pady=5)
+        self.cancel_button = tk.Button(root, text="Cancel", command=self.cancel_validation, state=tk.DISABLED)
+        self.cancel_button.pack(pady=(0, 10))
 
     def upload_rule(self):
         self.rule_path = filedialog.askopenfilename(filetypes=[("Excel Files", "*.xlsx")])
@@ -23,9 +62,10 @@ class RuleEngineApp:
             messagebox.showinfo("Uploaded", f"Rulebook: {os.path.basename(self.rule_path)}")
 
     def upload_doc(self):
-        self.doc_path = filedialog.askopenfilename(filetypes=[("Documents", "*.docx *.pdf")])
-        if self.doc_path:
-            messagebox.showinfo("Uploaded", f"Document: {os.path.basename(self.doc_path)}")
+        self.doc_paths = list(filedialog.askopenfilenames(filetypes=[("Documents", "*.docx *.pdf")]))
+        if self.doc_paths:
+            names = ', '.join(os.path.basename(path) for path in self.doc_paths)
+            messagebox.showinfo("Uploaded", f"Documents: {names}")
 
     def upload_json(self):
         self.json_path = filedialog.askopenfilename(filetypes=[("JSON Files", "*.json")])
@@ -33,21 +73,110 @@ class RuleEngineApp:
             messagebox.showinfo("Uploaded", f"JSON: {os.path.basename(self.json_path)}")
 
     def run_validation(self):
-        if not all([self.rule_path, self.doc_path, self.json_path]):
+        if not all([self.rule_path, self.doc_paths, self.json_path]):
             messagebox.showerror("Error", "Please upload all required files.")
             return
 
-        output_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")])
-        if not output_path:
-            return
+        if len(self.doc_paths) == 1:
+            output_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")])
+            if not output_path:
+                return
+            jobs = [(self.doc_paths[0], output_path)]
+        else:
+            output_dir = filedialog.askdirectory(title="Folder for the result workbooks")
+            if not output_dir:
+                return
+            jobs = [(path, os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + "_results.xlsx"))
+                    for path in self.doc_paths]
+
+        self.cancel_event = threading.Event()
+        self.progress = {doc_path: 0.0 for doc_path, _ in jobs}
+        self.progress_bar['value'] = 0
+        self.status.config(text="Loading...")
+        self.run_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        threading.Thread(target=self.validate_all, args=(self.rule_path, self.json_path, jobs, self.cancel_event),
+                         daemon=True).start()
+        self.root.after(POLL_MS, self.poll_events)
+
+    def validate_all(self, rule_path, json_path, jobs, cancel):
+        # Runs off the Tk thread; everything it learns goes through self.events.
+        def validate(doc_path, output_path):
+            def progress(done, total):
+                self.events.put(('progress', doc_path, done / total if total else 1.0))
+            try:
+                run_engine(rule_path, doc_path, json_path, output_path, progress=progress, cancel=cancel)
+                self.events.put(('done', doc_path, output_path))
+            except Exception as e:
+                # The engine only stops early with ValidationCancelled once cancel is set.
+                if cancel.is_set():
+                    self.events.put(('cancelled', doc_path, None))
+                else:
+                    self.events.put(('error', doc_path, str(e)))
+
+        with ThreadPoolExecutor(max_workers=min(len(jobs), MAX_CONCURRENT_DOCUMENTS)) as pool:
+            for doc_path, output_path in jobs:
+                pool.submit(validate, doc_path, output_path)
+        self.events.put(('finished', None, None))
+
+    def poll_events(self):
+        finished = False
+        while True:
+            try:
+                kind, doc_path, value = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self.progress[doc_path] = value
+            elif kind == 'done':
+                self.progress[doc_path] = 1.0
+                self.outcomes.append(f"{os.path.basename(doc_path)}: saved to {value}")
+            elif kind == 'error':
+                self.progress[doc_path] = 1.0
+                self.outcomes.append(f"{os.path.basename(doc_path)}: ERROR {value}")
+            elif kind == 'cancelled':
+                self.outcomes.append(f"{os.path.basename(doc_path)}: cancelled")
+            elif kind == 'finished':
+                finished = True
+
+        if self.progress:
+            self.progress_bar['value'] = 100 * sum(self.progress.values()) / len(self.progress)
+            complete = sum(1 for value in self.progress.values() if value >= 1.0)
+            if not self.cancel_event.is_set():
+                self.status.config(text=f"Validated {complete} of {len(self.progress)} document(s)")
+        if finished:
+            self.finish_validation()
+        else:
+            self.root.after(POLL_MS, self.poll_events)
+
+    def finish_validation(self):
+        self.run_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status.config(text="Cancelled" if self.cancel_event.is_set() else "Done")
+        outcomes, self.outcomes = self.outcomes, []
+        if any(': ERROR ' in line for line in outcomes):
+            messagebox.showerror("Error", "\n".join(outcomes))
+        elif self.cancel_event.is_set():
+            messagebox.showinfo("Cancelled", "\n".join(outcomes) or "Validation cancelled.")
+        else:
+            messagebox.showinfo("Success", "Validation complete.\n" + "\n".join(outcomes))
+
+    def cancel_validation(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.status.config(text="Cancelling...")
+            self.cancel_button.config(state=tk.DISABLED)
 
-        try:
-            run_engine(self.rule_path, self.doc_path, self.json_path, output_path)
-            messagebox.showinfo("Success", f"Validation complete. Results saved to:{output_path}")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+def report_startup(root):
+    print(f"startup {time.perf_counter() - _STARTED:.3f}s", flush=True)
+    root.destroy()
 
 if __name__ == "__main__":
+    # Needed by the frozen build: the engine extracts large PDFs in worker processes.
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = RuleEngineApp(root)
+    threading.Thread(target=prewarm, daemon=True).start()
+    if os.environ.get(STARTUP_PROBE_ENV):
+        root.after(0, report_startup, root)
     root.mainloop()
@@ -0,0 +1,74 @@
+import functools
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_collector = ContextVar('matchwise_stats', default=None)
+
+class Stats:
+    """Wall time, call count and bytes processed per instrumented stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, name, seconds, nbytes=0):
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = [0, 0.0, 0]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += nbytes
+
+    def rows(self):
+        return [{"Stage": name, "Calls": calls, "Seconds": round(seconds, 6), "Bytes": nbytes}
+                for name, (calls, seconds, nbytes) in self.stages.items()]
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.rows(), f, indent=2)
+
+def current():
+    return _collector.get()
+
+@contextmanager
+def collecting(stats=None):
+    """Record instrumented calls made in this context into ``stats``."""
+    stats = stats if stats is not None else Stats()
+    token = _collector.set(stats)
+    try:
+        yield stats
+    finally:
+        _collector.reset(token)
+
+@contextmanager
+def stage(name, nbytes=0):
+    stats = _collector.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.record(name, time.perf_counter() - start, nbytes)
+
+def instrumented(name, size=None):
+    """Time calls to the decorated function while a collector is active.
+
+    ``size(result, *args, **kwargs)`` returns the bytes processed by a call.
+    Outside ``collecting()`` the wrapper costs one context-variable lookup.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stats = _collector.get()
+            if stats is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            stats.record(name, elapsed, size(result, *args, **kwargs) if size else 0)
+            return result
+        return wrapper
+    return decorate
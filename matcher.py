@@ -0,0 +1,98 @@
+from collections import deque
+
+class MultiPatternMatcher:
+    """Aho-Corasick automaton over many patterns, scanned in a single pass.
+
+    Patterns are registered with a key (typically a rule id); ``scan`` returns
+    ``{key: [start offsets]}`` for every key whose pattern occurs in the text,
+    and ``stream`` scans a text that arrives in chunks.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._link = [0]
+        self._depth = [0]
+        self._empty = []
+        self._built = False
+
+    def add(self, key, pattern):
+        if not pattern:
+            self._empty.append(key)
+            return
+        goto = self._goto
+        node = 0
+        for ch in pattern:
+            nxt = goto[node].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[node][ch] = nxt
+                goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._link.append(0)
+                self._depth.append(self._depth[node] + 1)
+            node = nxt
+        self._out[node].append(key)
+        self._built = False
+
+    def build(self):
+        goto, fail, out, link = self._goto, self._fail, self._out, self._link
+        queue = deque(goto[0].values())
+        for node in queue:
+            fail[node] = link[node] = 0
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[child] = f
+                # Nearest proper suffix that ends a pattern, so reporting
+                # walks only nodes with output.
+                link[child] = f if out[f] else link[f]
+                queue.append(child)
+        self._built = True
+
+    def scan(self, text):
+        return self.stream().feed(text)
+
+    def stream(self):
+        """Return a MatchStream for scanning a text fed in consecutive chunks."""
+        if not self._built:
+            self.build()
+        return MatchStream(self)
+
+class MatchStream:
+    """Automaton state carried from one chunk of a text to the next, so a
+    pattern straddling a chunk boundary is still found."""
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.node = 0
+        self.offset = 0
+        self._pending = {key: [0] for key in matcher._empty}
+
+    def feed(self, text):
+        """Return ``{key: [start offsets]}`` for the matches ending in
+        ``text``, with offsets into the whole stream."""
+        m = self.matcher
+        goto, fail, out, link, depth = m._goto, m._fail, m._out, m._link, m._depth
+        hits, self._pending = self._pending, {}
+        node = self.node
+        base = self.offset + 1
+        for i, ch in enumerate(text, base):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            o = node if out[node] else link[node]
+            while o:
+                start = i - depth[o]
+                for key in out[o]:
+                    hits.setdefault(key, []).append(start)
+                o = link[o]
+        self.node = node
+        self.offset += len(text)
+        return hits
@@ -0,0 +1,40 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """A small thread-safe mapping that drops the least recently used entry
+    once it holds ``capacity`` items."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+    def __getstate__(self):
+        # Entries are not carried across processes; the copy starts empty.
+        return self.capacity
+
+    def __setstate__(self, capacity):
+        self.__init__(capacity)
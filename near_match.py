@@ -0,0 +1,67 @@
+import re
+from array import array
+from difflib import SequenceMatcher
+
+import numpy as np
+
+_WORD = re.compile(r'\S+')
+
+# Candidate passages scored per rule, and the rarest words used to find them.
+MAX_CANDIDATES = 20
+SEED_WORDS = 8
+# Words occurring more often than this are too common to place a passage.
+MAX_POSTINGS = 5000
+MIN_SCORE = 0.6
+
+class NearMatchIndex:
+    """Word positions of a normalized document, for finding the passage
+    closest to a text that is not in it verbatim.
+
+    Candidates are the word windows where the target's rarest words line up;
+    only those are scored with difflib, so the cost per target is bounded by
+    ``max_candidates`` rather than the document length.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.starts = array('i')
+        self.ends = array('i')
+        postings = {}
+        for i, m in enumerate(_WORD.finditer(text)):
+            self.starts.append(m.start())
+            self.ends.append(m.end())
+            postings.setdefault(m.group(), []).append(i)
+        self.postings = {word: np.array(positions, dtype=np.intp) for word, positions in postings.items()}
+
+    def closest(self, target, max_candidates=MAX_CANDIDATES):
+        """Return ``(score, start, end)`` of the best passage for the
+        normalized ``target``, or None if no word of it occurs."""
+        words = target.split()
+        seeds = sorted((len(self.postings[word]), j, word) for j, word in enumerate(words)
+                       if word in self.postings)
+        seeds = [seed for seed in seeds if seed[0] <= MAX_POSTINGS][:SEED_WORDS] or seeds[:1]
+        if not seeds:
+            return None
+
+        # Each occurrence of a seed word votes for the window start that would
+        # align it with its position in the target.
+        votes = np.bincount(np.maximum(np.concatenate([self.postings[word] - j for _, j, word in seeds]), 0))
+        top = np.flatnonzero(votes)
+        if len(top) > max_candidates:
+            top = top[np.argpartition(votes[top], -max_candidates)[-max_candidates:]]
+        top = top[np.argsort(-votes[top], kind='stable')]
+
+        best = None
+        last = len(self.starts) - 1
+        matcher = SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(target)
+        for first in top.tolist():
+            start = self.starts[first]
+            end = self.ends[min(first + len(words) - 1, last)]
+            matcher.set_seq1(self.text[start:end])
+            if best is not None and matcher.quick_ratio() <= best[0]:
+                continue
+            score = matcher.ratio()
+            if best is None or score > best[0]:
+                best = (score, start, end)
+        return best
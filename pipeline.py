@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from batch import load_pairs, output_path_for
+from diagnostics import configure_logging
+from rules import (LOCATION_COLUMN, RESULT_COLUMNS, available_cores, evaluate_rules, load_document_data, load_rules,
+                   load_test_data, result_rows, status_counts, write_results)
+
+# Items waiting between two stages; bounds how many documents are in memory.
+QUEUE_SIZE = 4
+FETCHERS = 4
+
+_DONE = object()
+
+def _read(doc_path, json_path):
+    with open(doc_path, 'rb') as f:
+        return f.read(), load_test_data(json_path)
+
+def _evaluate(plan, document, input_data):
+    locations = [None] * len(plan)
+    return evaluate_rules(plan, document, input_data, locations=locations), locations
+
+def _write(plan, outcomes, locations, output_path):
+    write_results(result_rows(plan, outcomes, locations=locations), output_path,
+                  columns=RESULT_COLUMNS + [LOCATION_COLUMN])
+    return status_counts(outcomes)
+
+async def _stage(inbox, outbox, func, workers):
+    """Run ``workers`` tasks applying ``func`` to items from ``inbox``.
+
+    A failed item is passed on with its ``error`` set, so later stages skip
+    it and the writer still reports it.
+    """
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                # Leave the marker for the sibling workers.
+                await inbox.put(_DONE)
+                return
+            if 'error' not in item:
+                try:
+                    await func(item)
+                except Exception as e:
+                    item['error'] = f"{type(e).__name__}: {e}"
+            await outbox.put(item)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    await outbox.put(_DONE)
+
+async def run_pipeline(plan, pairs, output_dir, workers=None, fetchers=FETCHERS, queue_size=QUEUE_SIZE,
+                       on_result=None):
+    """Validate ``(document, test_data)`` pairs as an overlapping pipeline.
+
+    Documents are read in a thread pool, extracted in a process pool,
+    evaluated in one thread and written in another. Each stage feeds the
+    next through a queue of ``queue_size`` items, so a slow stage holds the
+    others back instead of letting documents pile up in memory.
+    ``on_result`` is called with each document's result dict as it completes.
+    """
+    workers = workers or available_cores()
+    os.makedirs(output_dir, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    pending, fetched, extracted, evaluated, finished = (asyncio.Queue(queue_size) for _ in range(5))
+    results = []
+
+    with ThreadPoolExecutor(max_workers=fetchers) as io_pool, \
+            ProcessPoolExecutor(max_workers=workers) as cpu_pool, \
+            ThreadPoolExecutor(max_workers=1) as eval_pool, \
+            ThreadPoolExecutor(max_workers=1) as write_pool:
+        async def feed():
+            for doc_path, json_path in pairs:
+                await pending.put({'document': doc_path, 'test_data': json_path,
+                                   'output': output_path_for(doc_path, output_dir)})
+            await pending.put(_DONE)
+
+        async def fetch(item):
+            item['data'], item['input'] = await loop.run_in_executor(io_pool, _read, item['document'],
+                                                                     item['test_data'])
+
+        async def extract(item):
+            item['doc'] = await loop.run_in_executor(cpu_pool, load_document_data, item.pop('data'),
+                                                     item['document'])
+
+        async def evaluate(item):
+            item['outcomes'], item['locations'] = await loop.run_in_executor(
+                eval_pool, _evaluate, plan, item.pop('doc'), item.pop('input'))
+
+        async def write(item):
+            item.update(await loop.run_in_executor(write_pool, _write, plan, item.pop('outcomes'),
+                                                   item.pop('locations'), item['output']))
+
+        async def collect():
+            while True:
+                item = await finished.get()
+                if item is _DONE:
+                    return
+                for key in ('data', 'input', 'doc', 'outcomes', 'locations'):
+                    item.pop(key, None)
+                results.append(item)
+                if on_result is not None:
+                    on_result(item)
+
+        await asyncio.gather(
+            feed(),
+            _stage(pending, fetched, fetch, fetchers),
+            _stage(fetched, extracted, extract, workers),
+            _stage(extracted, evaluated, evaluate, 1),
+            _stage(evaluated, finished, write, 1),
+            collect(),
+        )
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate many documents with overlapping read, extract and "
+                                                 "evaluate stages.")
+    parser.add_argument('rules', help="rulebook Excel file")
+    parser.add_argument('source', help="directory of document/JSON pairs, or a CSV/JSON manifest")
+    parser.add_argument('output_dir', help="directory for the per-document result workbooks")
+    parser.add_argument('--workers', type=int, default=None, help="extraction processes (default: available cores)")
+    parser.add_argument('--fetchers', type=int, default=FETCHERS, help="concurrent document reads")
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help="documents buffered between stages")
+    parser.add_argument('--log-level', default=None)
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+
+    def report(result):
+        if 'error' in result:
+            print(f"{result['document']}: ERROR {result['error']}", flush=True)
+        else:
+            print(f"{result['document']}: PASS={result['PASS']} FAIL={result['FAIL']} "
+                  f"SKIPPED={result['SKIPPED']} -> {result['output']}", flush=True)
+
+    plan = load_rules(args.rules)
+    results = asyncio.run(run_pipeline(plan, load_pairs(args.source), args.output_dir, args.workers,
+                                       args.fetchers, args.queue_size, report))
+    return 1 if any('error' in result for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import argparse
+import json
+import logging
+import os
+import sys
+
+from diagnostics import configure_logging
+from result_sink import open_sinks
+from rules import (LOCATION_COLUMN, RESULT_COLUMNS, evaluate_rules, explain_failures, load_document, load_rules,
+                   result_rows, unwrap_test_data)
+
+logger = logging.getLogger(__name__)
+
+RECORD_COLUMNS = ["Record", "Document"] + RESULT_COLUMNS + [LOCATION_COLUMN]
+_SKIP = ' \t\r\n,'
+
+def iter_json_values(f, chunk_size=1 << 16):
+    """Yield the values of a JSON array, or of JSON Lines / concatenated
+    JSON, read from ``f`` a chunk at a time.
+
+    Only the record being decoded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    in_array = None
+    while True:
+        while pos < len(buf) and buf[pos] in _SKIP:
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                return
+            chunk = f.read(chunk_size)
+            buf, pos, eof = chunk, 0, not chunk
+            continue
+        if in_array is None:
+            in_array = buf[pos] == '['
+            if in_array:
+                pos += 1
+                continue
+        if in_array and buf[pos] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The record runs past the buffer; read on and decode it again.
+            chunk = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        yield value
+        pos = end
+
+def iter_records(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from iter_json_values(f)
+
+def record_document(record, field, base_dir):
+    value = record.get(field)
+    if not value:
+        raise KeyError(f"Record has no '{field}' field")
+    return value if os.path.isabs(value) else os.path.join(base_dir, value)
+
+def validate_records(plan, records, base_dir, sink, field='document', id_field=None, near_matches=False):
+    """Validate each record against the document named by its ``field`` and
+    stream the rows into ``sink``. Returns the status counts.
+
+    Consecutive records naming the same document share its parsed context;
+    other repeats come from the document cache.
+    """
+    counts = {'PASS': 0, 'FAIL': 0, 'SKIPPED': 0, 'ERROR': 0}
+    current_path = document = None
+    for number, record in enumerate(records, 1):
+        is_object = isinstance(record, dict)
+        record_id = record.get(id_field, number) if id_field and is_object else number
+        try:
+            if not is_object:
+                raise ValueError(f"record is a JSON {type(record).__name__}, not an object")
+            doc_path = record_document(record, field, base_dir)
+            if doc_path != current_path:
+                current_path, document = doc_path, load_document(doc_path)
+            locations = [None] * len(plan)
+            input_data = unwrap_test_data(record)
+            outcomes = evaluate_rules(plan, document, input_data, locations=locations)
+            if near_matches:
+                outcomes = explain_failures(plan, document, input_data, outcomes)
+        except Exception as e:
+            logger.error("Record %s: %s: %s", record_id, type(e).__name__, e)
+            counts['ERROR'] += 1
+            current_path = None
+            sink.write({"Record": record_id, "Document": record.get(field) if is_object else None, "Status": "ERROR",
+                        "Reason": f"{type(e).__name__}: {e}"})
+            continue
+        for row in result_rows(plan, outcomes, locations=locations):
+            row["Record"] = record_id
+            row["Document"] = doc_path
+            sink.write(row)
+        for status, _ in outcomes:
+            counts[status] += 1
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate many test-data records against one rulebook.")
+    parser.add_argument('rules', help="rulebook Excel file")
+    parser.add_argument('records', help="JSON array or JSON Lines file of test-data records")
+    parser.add_argument('output', nargs='+', help="consolidated report(s): .xlsx, .csv or .jsonl")
+    parser.add_argument('--field', default='document', help="record field naming its document (default: document)")
+    parser.add_argument('--id-field', default=None, help="record field used as the Record column (default: position)")
+    parser.add_argument('--documents', default=None,
+                        help="directory relative document paths are resolved against (default: the records file's)")
+    parser.add_argument('--near-matches', action='store_true',
+                        help="report the closest passage for rules whose text was not found")
+    parser.add_argument('--log-level', default=None)
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+
+    plan = load_rules(args.rules)
+    base_dir = args.documents or os.path.dirname(os.path.abspath(args.records))
+    sink = open_sinks(args.output, RECORD_COLUMNS)
+    try:
+        counts = validate_records(plan, iter_records(args.records), base_dir, sink, args.field, args.id_field,
+                                  args.near_matches)
+    finally:
+        sink.close()
+    print(' '.join(f"{status}={count}" for status, count in counts.items()))
+    return 1 if counts['ERROR'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import csv
+import json
+import math
+import os
+
+from openpyxl import Workbook
+
+FLUSH_EVERY = 200
+
+def _cell(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+class ExcelSink:
+    """Rows streamed into an openpyxl write-only workbook.
+
+    Rows are spooled to a temporary file as they arrive, so memory stays
+    flat, but the workbook only becomes readable once ``close`` saves it.
+    """
+
+    def __init__(self, path, columns, sheet_name="Sheet1"):
+        self.path = path
+        self.columns = list(columns)
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(sheet_name)
+        self._sheet.append(self.columns)
+
+    def write(self, row):
+        self._sheet.append([_cell(row.get(column)) for column in self.columns])
+
+    def close(self, summary=None):
+        if summary is not None:
+            sheet = self._workbook.create_sheet("Summary")
+            sheet.append(["Stage", "Calls", "Seconds", "Bytes"])
+            for row in summary.rows():
+                sheet.append([row["Stage"], row["Calls"], row["Seconds"], row["Bytes"]])
+        self._workbook.save(self.path)
+
+class CsvSink:
+    """Rows appended to a CSV file and flushed every ``flush_every`` rows,
+    so a crash loses at most the last unflushed batch."""
+
+    def __init__(self, path, columns, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=list(columns), extrasaction='ignore')
+        self._writer.writeheader()
+        self._pending = 0
+
+    def write(self, row):
+        self._writer.writerow({key: _cell(value) for key, value in row.items()})
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._pending = 0
+
+    def close(self, summary=None):
+        self._file.close()
+
+class JsonlSink:
+    """One JSON object per row, flushed every ``flush_every`` rows."""
+
+    def __init__(self, path, columns, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.columns = list(columns)
+        self.flush_every = flush_every
+        self._file = open(path, 'w', encoding='utf-8')
+        self._pending = 0
+
+    def write(self, row):
+        record = {column: _cell(row.get(column)) for column in self.columns}
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._pending = 0
+
+    def close(self, summary=None):
+        if summary is not None:
+            self._file.write(json.dumps({"summary": summary.rows()}) + "\n")
+        self._file.close()
+
+class MultiSink:
+    """Fan every row out to several sinks."""
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def write(self, row):
+        for sink in self.sinks:
+            sink.write(row)
+
+    def close(self, summary=None):
+        # Close every sink even if one fails, then raise the first error.
+        error = None
+        for sink in self.sinks:
+            try:
+                sink.close(summary)
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+SINKS = {'.xlsx': ExcelSink, '.csv': CsvSink, '.jsonl': JsonlSink}
+
+def open_sink(path, columns):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SINKS:
+        raise ValueError(f"Unsupported output type: {path}")
+    return SINKS[ext](path, columns)
+
+def open_sinks(paths, columns):
+    if isinstance(paths, str):
+        return open_sink(paths, columns)
+    sinks = []
+    try:
+        for path in paths:
+            sinks.append(open_sink(path, columns))
+    except BaseException:
+        # Don't leave the sinks opened so far holding their files.
+        for sink in sinks:
+            sink.close()
+        raise
+    return MultiSink(sinks)
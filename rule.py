@@ -1,38 +1,39 @@
 import pandas as pd
 import json
-import fitz  # PyMuPDF
 import docx
 import re
+import logging
+from diagnostics import configure_logging, tracing
+from document import DocumentContext, normalize_text
+from rules import extract_pdf
+
+logger = logging.getLogger(__name__)
 
 def extract_text_from_pdf(pdf_path):
-    with fitz.open(pdf_path) as doc:
-        text = ""
-        for page in doc:
-            text += page.get_text()
-    return text
+    return extract_pdf(pdf_path)[0]
 
-def extract_text_from_word(doc_path):
+def extract_word(doc_path):
+    # Parse once and keep each paragraph with its normalized run text, so
+    # styled rules look paragraphs up instead of reopening the document.
     doc = docx.Document(doc_path)
-    return '\n'.join([para.text for para in doc.paragraphs])
+    paragraphs = [(normalize_text(''.join([run.text for run in para.runs])), para) for para in doc.paragraphs]
+    return '\n'.join([para.text for para in doc.paragraphs]), paragraphs
 
-def normalize_text(text):
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    return ' '.join(text.split())
+def extract_text_from_word(doc_path):
+    return extract_word(doc_path)[0]
 
-def find_paragraph_with_text(doc_path, target_text):
-    doc = docx.Document(doc_path)
+def find_paragraph_with_text(paragraphs, target_text):
     target_text_clean = normalize_text(target_text)
-    for para in doc.paragraphs:
-        full_text = ''.join([run.text for run in para.runs])
-        if normalize_text(full_text).find(target_text_clean) != -1:
+    for text, para in paragraphs:
+        if text.find(target_text_clean) != -1:
             return para
     return None
 
 def clean_font_name(font_name):
     return re.sub(r'[^a-z]', '', font_name.lower())
 
-def validate_style(paragraph, style_requirements):
+def validate_style(paragraph, style_requirements, rule_id=None):
+    level = tracing(logger, rule_id)
     style_req = style_requirements.lower()
     required_font = None
     required_size = None
@@ -83,9 +84,12 @@ def validate_style(paragraph, style_requirements):
                 if style and style.font.size:
                     font_size = style.font.size.pt
             except Exception as e:
-                print(f"[DEBUG] Style fallback exception: {e}")
+                if level:
+                    logger.log(level, "Style fallback exception: %s", e)
 
-        print(f"[DEBUG] Run text: '{run.text.strip()}' | font: {font_name} | size: {font_size} | bold: {is_bold}")
+        if level:
+            logger.log(level, "Run text: '%s' | font: %s | size: %s | bold: %s",
+                       run.text.strip(), font_name, font_size, is_bold)
 
         font_match = size_match = bold_match = True
 
@@ -107,10 +111,8 @@ def validate_style(paragraph, style_requirements):
 
     return False, f"Style mismatch: font_match={font_match}, size_match={size_match}, bold_match={bold_match}"
 
-def validate_pdf_style(pdf_path, expected_text, style_requirements):
-    import re
-
-    doc = fitz.open(pdf_path)
+def validate_pdf_style(spans, expected_text, style_requirements, rule_id=None):
+    level = tracing(logger, rule_id)
     expected_norm = normalize_text(expected_text)
     style_req = style_requirements.lower()
 
@@ -131,28 +133,19 @@ def validate_pdf_style(pdf_path, expected_text, style_requirements):
         except:
             pass
 
-    for page in doc:
-        all_spans = []
-        all_text = ""
-
-        blocks = page.get_text("dict")["blocks"]
-        for block in blocks:
-            for line in block.get("lines", []):
-                for span in line.get("spans", []):
-                    text = span.get("text", "")
-                    all_spans.append((text, span))
-                    all_text += f"{text} "
-
+    for page, page_text in enumerate(spans.page_texts):
         # Text must be found somewhere in the page
-        if expected_norm in normalize_text(all_text):
-            for text, span in all_spans:
-                norm_span_text = normalize_text(text)
+        if expected_norm in page_text:
+            for i in spans.page_spans(page):
+                norm_span_text = spans.texts[i]
                 if norm_span_text in expected_norm or expected_norm.startswith(norm_span_text):
-                    font_name = span.get("font", "").lower()
-                    font_size = span.get("size", 0)
-                    is_bold = "bold" in font_name or (span.get("flags", 0) & 2 != 0)
+                    font_name = spans.fonts[i]
+                    font_size = spans.sizes[i]
+                    is_bold = "bold" in font_name or (spans.flags[i] & 2 != 0)
 
-                    print(f"[DEBUG] PDF Span matched: '{text}' | font: '{font_name}', size: {font_size}, bold: {is_bold}")
+                    if level:
+                        logger.log(level, "PDF Span matched: '%s' | font: '%s', size: %s, bold: %s",
+                                   norm_span_text, font_name, font_size, is_bold)
 
                     font_match = size_match = bold_match = True
 
@@ -173,21 +166,22 @@ def validate_pdf_style(pdf_path, expected_text, style_requirements):
 
     return False, "Expected text not found in PDF for style validation"
 
-def evaluate_rule(rule_row, document_text, input_data, document_path):
+def evaluate_rule(rule_row, document, input_data):
     rule_id = rule_row.get('Output Identifier', 'N/A')
     input_val = rule_row.get('Input Value', '')
     expected = rule_row['Output Language']
     style_req = rule_row.get('Style', '').strip()
 
-    print(f"\n[DEBUG] Evaluating Rule {rule_id}")
-    print(f"[DEBUG] Raw input_val = {repr(input_val)}")
+    level = tracing(logger, rule_id)
+    if level:
+        logger.log(level, "Evaluating Rule %s", rule_id)
+        logger.log(level, "Raw input_val = %r", input_val)
 
     input_data_lower = {k.lower(): v for k, v in input_data.items()}
 
     all_conditions = [cond.strip() for cond in re.split(r'\n|;', input_val) if cond.strip()]
-    print(f"[DEBUG] Parsed conditions ({len(all_conditions)}):")
-    for cond in all_conditions:
-        print(f"  -> {cond}")
+    if level:
+        logger.log(level, "Parsed conditions (%d): %s", len(all_conditions), all_conditions)
 
     for cond in all_conditions:
         if '=' not in cond:
@@ -206,13 +200,15 @@ def evaluate_rule(rule_row, document_text, input_data, document_path):
 
         if isinstance(actual_val, list):
             actual_norm_list = [normalize_text(str(v)) for v in actual_val]
-            print(f"[DEBUG] Compare list — key: {key}, expected: {expected_values}, actual: {actual_norm_list}")
+            if level:
+                logger.log(level, "Compare list — key: %s, expected: %s, actual: %s", key, expected_values, actual_norm_list)
             missing = [val for val in expected_values if val not in actual_norm_list]
             if missing:
                 return 'SKIPPED', f"List Mismatch for {key}: missing values {missing}"
         else:
             actual_norm = normalize_text(str(actual_val))
-            print(f"[DEBUG] Compare single — key: {key}, expected: {expected_values[0]}, actual: {actual_norm}")
+            if level:
+                logger.log(level, "Compare single — key: %s, expected: %s, actual: %s", key, expected_values[0], actual_norm)
             if len(expected_values) > 1:
                 return 'SKIPPED', f"Expected multiple values for {key} but field is not a list"
             if actual_norm != expected_values[0]:
@@ -227,22 +223,22 @@ def evaluate_rule(rule_row, document_text, input_data, document_path):
         expected = expected.replace(f"<{key}>", str(val))
 
     expected_clean = normalize_text(expected)
-    document_text_clean = normalize_text(document_text)
 
-    print(f"[DEBUG] FINAL TEXT MATCH CHECK — expected: {expected_clean[:80]}...")
+    if level:
+        logger.log(level, "FINAL TEXT MATCH CHECK — expected: %s...", expected_clean[:80])
 
-    if expected_clean in document_text_clean:
+    if expected_clean in document.normalized:
         if style_req:
-            if document_path.lower().endswith('.docx'):
-                para = find_paragraph_with_text(document_path, expected)
+            if document.kind == 'docx':
+                para = find_paragraph_with_text(document.paragraphs, expected)
                 if para:
-                    style_ok, style_reason = validate_style(para, style_req)
+                    style_ok, style_reason = validate_style(para, style_req, rule_id)
                     if not style_ok:
                         return 'FAIL', f"Style validation failed — {style_reason}"
                 else:
                     return 'FAIL', "Text matched but paragraph not found for style validation"
-            elif document_path.lower().endswith('.pdf'):
-                style_ok, style_reason = validate_pdf_style(document_path, expected, style_req)
+            elif document.kind == 'pdf':
+                style_ok, style_reason = validate_pdf_style(document.spans, expected, style_req, rule_id)
                 if not style_ok:
                     return 'FAIL', f"PDF Style validation failed — {style_reason}"
         return 'PASS', "All conditions met and text matched"
@@ -255,18 +251,21 @@ def load_rules(excel_path):
     return df
 
 def main():
+    configure_logging(default='INFO')
     excel_path = "Rules.xlsx"
     document_path = "1_of_1_GAI1356789_AccidentInsurance_GroupCertificate_EC1.docx"  # or .pdf
     json_path = "testdata.json"
 
     rules_df = load_rules(excel_path)
 
+    spans = paragraphs = None
     if document_path.lower().endswith('.pdf'):
-        document_text = extract_text_from_pdf(document_path)
+        document_text, spans = extract_pdf(document_path)
     elif document_path.lower().endswith('.docx'):
-        document_text = extract_text_from_word(document_path)
+        document_text, paragraphs = extract_word(document_path)
     else:
         raise ValueError("Unsupported document type. Use PDF or Word (.docx)")
+    document = DocumentContext(document_path, document_text, spans, paragraphs)
 
     with open(json_path, 'r') as f:
         raw_data = json.load(f)
@@ -275,14 +274,14 @@ def main():
     output_data = []
 
     for _, row in rules_df.iterrows():
-        print(f"\n[INFO] Running rule: {row.get('Output Identifier')}")
-        result, reason = evaluate_rule(row, document_text, input_data, document_path)
+        logger.info("Running rule: %s", row.get('Output Identifier'))
+        result, reason = evaluate_rule(row, document, input_data)
         output_data.append({
             "Output Identifier": row.get('Output Identifier'),
             "Status": result,
             "Reason": reason
         })
-        print(f"[RESULT] Rule {row.get('Output Identifier')}: {result} — {reason}")
+        logger.info("Rule %s: %s — %s", row.get('Output Identifier'), result, reason)
 
     result_df = pd.DataFrame(output_data)
     result_df.to_excel("rule_results.xlsx", index=False)
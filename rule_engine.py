@@ -2,20 +2,18 @@ import pandas as pd
 import json
 import fitz  # PyMuPDF
 import re
+import logging
+from diagnostics import configure_logging, trace, tracing
+from document import DocumentContext, normalize_text
+
+logger = logging.getLogger(__name__)
 
 def extract_text_from_pdf(pdf_path):
     with fitz.open(pdf_path) as doc:
-        text = ""
-        for page in doc:
-            text += page.get_text()
-    return text
-
-def normalize_text(text):
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    return ' '.join(text.split())
+        return "".join([page.get_text() for page in doc])
 
-def evaluate_rule(rule_row, pdf_text, input_data):
+def evaluate_rule(rule_row, document, input_data):
+    rule_id = rule_row.get('Rule No', 'N/A')
     input_val = rule_row.get('Input Value', '')
     expected = rule_row['Output Language']
 
@@ -36,18 +34,20 @@ def evaluate_rule(rule_row, pdf_text, input_data):
         actual_norm = normalize_text(str(input_actual))
         expected_norm = normalize_text(str(condition_val))
 
-        print(f"Checking conditional match for Rule {rule_row['Rule No']}:")
-        print(f"Raw Input Value: {input_val}")
-        print(f"From JSON: {condition_key} = {input_actual}")
-        print(f"Normalized: actual='{actual_norm}' vs expected='{expected_norm}'")
+        level = tracing(logger, rule_id)
+        if level:
+            logger.log(level, "Checking conditional match for Rule %s:", rule_id)
+            logger.log(level, "Raw Input Value: %s", input_val)
+            logger.log(level, "From JSON: %s = %s", condition_key, input_actual)
+            logger.log(level, "Normalized: actual='%s' vs expected='%s'", actual_norm, expected_norm)
 
         if actual_norm != expected_norm:
-            print(f"Skipping Rule {rule_row['Rule No']} — Condition Mismatch.")
+            trace(logger, rule_id, "Skipping Rule %s — Condition Mismatch.", rule_id)
             return 'SKIPPED', expected
 
     # 🔄 Replace placeholders like <Key>
     placeholders = re.findall(r"<(.*?)>", expected)
-    print(f"Placeholders found in rule: {placeholders}")
+    trace(logger, rule_id, "Placeholders found in rule: %s", placeholders)
 
     for key in placeholders:
         val = input_data.get(key, "")
@@ -55,47 +55,47 @@ def evaluate_rule(rule_row, pdf_text, input_data):
             val = list(val.values())[0] if val else ""
         expected = expected.replace(f"<{key}>", str(val))
 
-    print("Expected before normalize:", expected)
+    trace(logger, rule_id, "Expected before normalize: %s", expected)
 
     expected_clean = normalize_text(expected)
-    pdf_text_clean = normalize_text(pdf_text)
+    pdf_text_clean = document.normalized
 
     result = 'PASS' if expected_clean in pdf_text_clean else 'FAIL'
 
     if result == 'FAIL':
-        print("\nDEBUG FAIL >>>")
-        print("Expected Clean:", expected_clean)
-        print("PDF Text Contains Expected:", expected_clean in pdf_text_clean)
-        print("First 500 chars of PDF Text:\n", pdf_text_clean[:500])
-        print("-------------")
+        level = tracing(logger, rule_id)
+        if level:
+            logger.log(level, "FAIL for Rule %s — expected clean: %s", rule_id, expected_clean)
+            logger.log(level, "First 500 chars of PDF Text:\n%s", pdf_text_clean[:500])
 
     return result, expected
 
 def load_rules(excel_path):
     df = pd.read_excel(excel_path, engine='openpyxl')
     df.columns = df.columns.str.strip()
-    print("Loaded columns:", df.columns.tolist())
+    logger.info("Loaded columns: %s", df.columns.tolist())
     return df
 
 def main():
+    configure_logging(default='INFO')
     excel_path = "Rules.xlsx"
     pdf_path = "New_York_Life_Insurance.pdf"
     json_path = "testdata.json"
 
     rules_df = load_rules(excel_path)
-    pdf_text = extract_text_from_pdf(pdf_path)
+    document = DocumentContext(pdf_path, extract_text_from_pdf(pdf_path))
 
     with open(json_path, 'r') as f:
         raw_data = json.load(f)
         input_data = raw_data.get("testData", {})  
-    print("Loaded input data keys:", list(input_data.keys()))
+    logger.info("Loaded input data keys: %s", list(input_data.keys()))
 
     results = []
     for _, row in rules_df.iterrows():
         rule_id = row.get('Rule No', 'N/A')
-        result, expected = evaluate_rule(row, pdf_text, input_data)
+        result, expected = evaluate_rule(row, document, input_data)
         results.append(result)
-        print(f"Rule {rule_id}: {result}")
+        logger.info("Rule %s: %s", rule_id, result)
 
     rules_df['Result'] = results
     rules_df.to_excel("rule_results.xlsx", index=False)
@@ -0,0 +1,221 @@
+import re
+import numpy as np
+from document import normalize_text
+from memory_cache import LRUCache
+
+# Bump whenever the compiled record layout changes so cached plans are rebuilt.
+PLAN_VERSION = 4
+# Rendered expected texts kept per plan, across all of its templates.
+RENDER_CACHE_SIZE = 4096
+
+_DROP = re.compile(r'[^a-z0-9\s]')
+
+class Condition:
+    __slots__ = ('key', 'values')
+
+    def __init__(self, key, values):
+        self.key = key
+        self.values = values
+
+    def __repr__(self):
+        return f"Condition({self.key!r}, {self.values!r})"
+
+class StyleSpec:
+    __slots__ = ('font', 'size', 'bold')
+
+    def __init__(self, font=None, size=None, bold=False):
+        self.font = font
+        self.size = size
+        self.bold = bold
+
+    def __repr__(self):
+        return f"StyleSpec(font={self.font!r}, size={self.size!r}, bold={self.bold!r})"
+
+def _piece(text):
+    # Normalized text plus whether whitespace borders it, so pieces can be
+    # joined without normalizing the joined string again.
+    text = _DROP.sub('', text.lower())
+    return text[:1].isspace(), ' '.join(text.split()), text[-1:].isspace()
+
+def _join(pieces):
+    parts = []
+    space = False
+    for lead, core, trail in pieces:
+        if not core:
+            space = space or lead
+            continue
+        if parts and (space or lead):
+            parts.append(' ')
+        parts.append(core)
+        space = trail
+    return ''.join(parts)
+
+def _value(input_data, key):
+    val = input_data.get(key, "")
+    if isinstance(val, dict):
+        val = list(val.values())[0] if val else ""
+    return str(val)
+
+class Template:
+    """Output Language split at its ``<placeholder>`` markers, with the static
+    text between them normalized when the rulebook is compiled.
+
+    ``render`` returns the normalized expected text for one record, memoized
+    in ``cache`` by the values of the referenced keys. Nested markers, or
+    values that contain one, are substituted one key at a time as before.
+    """
+    __slots__ = ('text', 'static', 'keys', 'nested')
+
+    def __init__(self, text):
+        parts = re.split(r"<(.*?)>", text)
+        self.text = text
+        self.static = tuple(_piece(part) for part in parts[::2])
+        self.keys = tuple(parts[1::2])
+        self.nested = any('<' in key for key in self.keys)
+
+    def _substitute(self, values):
+        text = self.text
+        for key, value in zip(self.keys, values):
+            text = text.replace(f"<{key}>", value)
+        return normalize_text(text)
+
+    def render(self, input_data, cache=None):
+        values = tuple(_value(input_data, key) for key in self.keys)
+        key = (self, values)
+        rendered = cache.get(key) if cache is not None else None
+        if rendered is None:
+            if self.nested or any('<' in value for value in values):
+                rendered = self._substitute(values)
+            else:
+                pieces = [self.static[0]]
+                for value, static in zip(values, self.static[1:]):
+                    pieces.append(_piece(value))
+                    pieces.append(static)
+                rendered = _join(pieces)
+            if cache is not None:
+                cache.put(key, rendered)
+        return rendered
+
+class CompiledRule:
+    __slots__ = ('index', 'identifier', 'conditions', 'expected', 'template', 'style')
+
+    def __init__(self, index, identifier, conditions, expected, template, style):
+        self.index = index
+        self.identifier = identifier
+        self.conditions = conditions
+        self.expected = expected
+        self.template = template
+        self.style = style
+
+    @property
+    def placeholders(self):
+        return self.template.keys
+
+    def __repr__(self):
+        return f"CompiledRule({self.identifier!r}, conditions={len(self.conditions)}, style={self.style!r})"
+
+def _index(groups):
+    return {key: {value: np.array(ids, dtype=np.intp) for value, ids in by_value.items()}
+            for key, by_value in groups.items()}
+
+class RulePlan:
+    """Compiled rules plus an inverted index over their conditions.
+
+    Conditions are numbered in evaluation order; ``condition_rules``,
+    ``condition_keys`` and ``condition_sizes`` give each one's rule, key and
+    number of expected values. ``first_index[key][value]`` lists the
+    conditions whose first expected value is ``value`` and
+    ``value_index[key][value]`` those expecting ``value`` anywhere, so the
+    conditions a test-data value satisfies are found by lookup.
+    ``rendered`` memoizes expected texts for all of the plan's templates.
+    """
+    __slots__ = ('rules', 'condition_rules', 'condition_keys', 'condition_sizes', 'first_index', 'value_index',
+                 'rendered')
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.rendered = LRUCache(RENDER_CACHE_SIZE)
+        cond_rules = []
+        cond_keys = []
+        cond_sizes = []
+        first_index = {}
+        value_index = {}
+        for rule in rules:
+            for cond in rule.conditions:
+                cond_id = len(cond_rules)
+                cond_rules.append(rule.index)
+                cond_keys.append(cond.key)
+                cond_sizes.append(len(cond.values))
+                first_index.setdefault(cond.key, {}).setdefault(cond.values[0], []).append(cond_id)
+                by_value = value_index.setdefault(cond.key, {})
+                for value in cond.values:
+                    by_value.setdefault(value, []).append(cond_id)
+        self.condition_rules = np.array(cond_rules, dtype=np.intp)
+        self.condition_keys = np.array(cond_keys, dtype=object)
+        self.condition_sizes = np.array(cond_sizes, dtype=np.intp)
+        self.first_index = _index(first_index)
+        self.value_index = _index(value_index)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+def _cell(row, column):
+    value = row.get(column, '')
+    if value is None or value != value:  # NaN from an empty Excel cell
+        return ''
+    return str(value)
+
+def parse_conditions(input_val):
+    conditions = []
+    for cond in re.split(r'\n|;', input_val):
+        cond = cond.strip()
+        if '=' not in cond:
+            continue
+        key, val = cond.split('=', 1)
+        expected_val = val.strip()
+        expected_values = re.findall(r'"([^"]+)"', expected_val) or [v.strip() for v in expected_val.split(',')]
+        conditions.append(Condition(key.strip().lower(), tuple(normalize_text(v) for v in expected_values)))
+    return tuple(conditions)
+
+def parse_style(style_req):
+    style_req = style_req.strip().lower()
+    if not style_req:
+        return None
+    spec = StyleSpec()
+    if "style:" in style_req:
+        try:
+            spec.font = style_req.split("style:")[1].split()[0].strip()
+        except IndexError:
+            pass
+    if "size:" in style_req:
+        try:
+            spec.size = float(style_req.split("size:")[1].split()[0])
+        except (IndexError, ValueError):
+            pass
+    if "bold" in style_req:
+        spec.bold = True
+    return spec
+
+def compile_rule(index, row, templates=None):
+    # Rules with the same Output Language share one template.
+    expected = _cell(row, 'Output Language')
+    template = templates.get(expected) if templates is not None else None
+    if template is None:
+        template = Template(expected)
+        if templates is not None:
+            templates[expected] = template
+    return CompiledRule(
+        index,
+        row.get('Output Identifier'),
+        parse_conditions(_cell(row, 'Input Value')),
+        expected,
+        template,
+        parse_style(_cell(row, 'Style')),
+    )
+
+def compile_rules(rules_df):
+    templates = {}
+    return RulePlan([compile_rule(idx, row, templates) for idx, (_, row) in enumerate(rules_df.iterrows())])
@@ -1,115 +1,208 @@
+import numpy as np
 import pandas as pd
+import hashlib
+import io
 import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 import fitz  # PyMuPDF
 import docx
 import re
+from document import DocumentContext, Location, ParagraphIndex, SpanIndex, normalize_text, normalize_with_offsets
+from matcher import MultiPatternMatcher
+from near_match import MAX_CANDIDATES, MIN_SCORE
+from rule_plan import PLAN_VERSION, CompiledRule, RulePlan, compile_rules
+from disk_cache import cache_key, file_digest, load_pickle, store_pickle
+from document_cache import FORMAT_VERSION as DOCUMENT_FORMAT_VERSION, load_cached_document, store_document
+from diagnostics import active, trace
+from instrumentation import Stats, collecting, instrumented, stage
+from result_sink import open_sinks
+
+logger = logging.getLogger(__name__)
+
+# Compiled plans and incremental state are pickles, so they live in a
+# folder private to the user rather than next to a possibly shared workbook.
+RULE_CACHE_DIR = (os.environ.get('MATCHWISE_RULE_CACHE')
+                  or os.path.join(os.path.expanduser('~'), '.cache', 'matchwise', 'rules'))
+RULE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+PARALLEL_PAGE_THRESHOLD = 200
+DOCUMENT_CACHE_DIR = (os.environ.get('MATCHWISE_DOCUMENT_CACHE')
+                      or os.path.join(os.path.expanduser('~'), '.cache', 'matchwise', 'documents'))
+DOCUMENT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+NOT_FOUND = "Expected output not found"
+# evaluate_rules reports progress about this many times per run.
+PROGRESS_STEPS = 100
+
+class ValidationCancelled(Exception):
+    pass
+
+def check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise ValidationCancelled("Validation cancelled")
+
+def _path_size(result, path, *args, **kwargs):
+    return os.path.getsize(path) if isinstance(path, str) else 0
+
+def _document_size(result, plan, document, *args, **kwargs):
+    return len(document.normalized)
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def _extract_pages(doc, start, stop):
+    # One get_text("dict") pass yields both the plain text and the span
+    # index that PDF style rules query later.
+    spans = SpanIndex()
+    pages = []
+    offset = 0
+    for page_no in range(start, stop):
+        text = spans.add_page(doc[page_no].get_text("dict"), offset)
+        pages.append(text)
+        offset += len(text)
+    return "".join(pages), spans
+
+def _extract_page_range(pdf_path, start, stop):
+    with fitz.open(pdf_path) as doc:
+        return _extract_pages(doc, start, stop)
 
-def extract_text_from_pdf(pdf_path):
+@instrumented('extract_pdf', size=_path_size)
+def extract_pdf(pdf_path, workers=None):
+    # Large PDFs are split into page ranges, each extracted by a worker
+    # process with its own fitz handle, then stitched back together in order.
     with fitz.open(pdf_path) as doc:
-        return "".join([page.get_text() for page in doc])
+        page_count = doc.page_count
+        workers = min(workers or available_cores(), -(-page_count // PARALLEL_PAGE_THRESHOLD))
+        if workers <= 1:
+            return _extract_pages(doc, 0, page_count)
+
+    chunk = -(-page_count // workers)
+    starts = list(range(0, page_count, chunk))
+    stops = [min(start + chunk, page_count) for start in starts]
+    with ProcessPoolExecutor(max_workers=len(starts)) as pool:
+        parts = list(pool.map(_extract_page_range, [pdf_path] * len(starts), starts, stops))
+
+    spans = SpanIndex()
+    texts = []
+    offset = 0
+    for text, part in parts:
+        spans.extend(part, offset)
+        texts.append(text)
+        offset += len(text)
+    return "".join(texts), spans
+
+@instrumented('extract_pdf', size=lambda result, data: len(data))
+def extract_pdf_data(data):
+    with fitz.open(stream=data, filetype='pdf') as doc:
+        return _extract_pages(doc, 0, doc.page_count)
+
+def iter_pdf_pages(pdf_path):
+    """Yield ``(text, spans)`` one page at a time, with span offsets relative
+    to the page, so only the current page is ever held in memory."""
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            spans = SpanIndex()
+            yield spans.add_page(page.get_text("dict"), 0), spans
 
-def extract_text_from_word(doc_path):
-    doc = docx.Document(doc_path)
-    return "\n".join([para.text for para in doc.paragraphs])
+def extract_text_from_pdf(pdf_path):
+    return extract_pdf(pdf_path)[0]
 
-def normalize_text(text):
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    return ' '.join(text.split())
+def iter_word_paragraphs(doc_path):
+    """Yield ``(text, run_text, runs)`` for each paragraph, with every run's
+    effective style resolved."""
+    return _word_paragraphs(docx.Document(doc_path))
 
-def find_paragraph_with_text(doc_path, target_text):
-    doc = docx.Document(doc_path)
-    target_text_clean = normalize_text(target_text)
+def _word_paragraphs(doc):
+    style_sizes = {}
     for para in doc.paragraphs:
-        full_text = ''.join([run.text for run in para.runs])
-        if normalize_text(full_text).find(target_text_clean) != -1:
-            return para, doc
-    return None, doc
-
-def validate_style(paragraph, style_requirements, doc):
-    style_req = style_requirements.lower()
-    required_font = None
-    required_size = None
-    required_bold = False
-
-    if "style:" in style_req:
-        required_font = style_req.split("style:")[1].split()[0].strip().lower()
-    if "size:" in style_req:
-        required_size = float(style_req.split("size:")[1].split()[0])
-    if "bold" in style_req:
-        required_bold = True
-
-    for run in paragraph.runs:
-        font_name = run.font.name if run.font and run.font.name else None
-        font_size = run.font.size.pt if run.font and run.font.size else None
-        is_bold = run.bold
-
-        if not font_size:
-            try:
-                style_id = paragraph.style.style_id
-                style = doc.styles[style_id]
-                if style and style.font.size:
-                    font_size = style.font.size.pt
-            except:
-                pass
+        runs = para.runs
+        yield (para.text, ''.join([run.text for run in runs]),
+               [_resolve_run_style(para, run, doc, style_sizes) for run in runs])
+
+@instrumented('extract_word', size=_path_size)
+def extract_word(doc_path):
+    # Parse once and resolve every run's effective style up front, so styled
+    # rules only look paragraphs up in the index.
+    paragraphs = ParagraphIndex()
+    texts = []
+    offset = 0
+    for text, run_text, runs in iter_word_paragraphs(doc_path):
+        paragraphs.add_paragraph(offset, run_text, runs)
+        texts.append(text)
+        offset += len(text) + 1
+    return "\n".join(texts), paragraphs
 
+def extract_text_from_word(doc_path):
+    return extract_word(doc_path)[0]
+
+def _style_size(para, doc, style_sizes):
+    try:
+        style_id = para.style.style_id
+    except Exception:
+        return None
+    if style_id not in style_sizes:
+        size = None
+        try:
+            para_style = doc.styles[style_id]
+            if para_style and para_style.font.size:
+                size = para_style.font.size.pt
+        except Exception:
+            pass
+        style_sizes[style_id] = size
+    return style_sizes[style_id]
+
+def _resolve_run_style(para, run, doc, style_sizes):
+    font_name = run.font.name if run.font and run.font.name else None
+    font_size = run.font.size.pt if run.font and run.font.size else None
+    if not font_size:
+        font_size = _style_size(para, doc, style_sizes)
+    return font_name, font_size, bool(run.bold)
+
+def find_paragraph_with_text(paragraphs, target_text):
+    return paragraphs.find(normalize_text(target_text))
+
+@instrumented('validate_style')
+def validate_style(runs, style):
+    for font_name, font_size, is_bold in runs:
         font_match = size_match = bold_match = True
 
-        if required_font:
+        if style.font:
             clean_font = re.sub(r'[^a-z]', '', (font_name or "").lower())
-            font_match = required_font in clean_font
+            font_match = style.font in clean_font
 
-        if required_size is not None:
-            size_match = font_size is not None and abs(font_size - required_size) < 0.5
+        if style.size is not None:
+            size_match = font_size is not None and abs(font_size - style.size) < 0.5
 
-        if required_bold:
-            bold_match = bool(is_bold)
+        if style.bold:
+            bold_match = is_bold
 
         if font_match and size_match and bold_match:
             return True, "Style matched"
 
     return False, "Style mismatch"
 
-def validate_pdf_style(pdf_path, expected_text, style_requirements):
-    doc = fitz.open(pdf_path)
+def _span_style_matches(spans, i, style):
+    font_name = spans.fonts[i]
+    is_bold = "bold" in font_name or (spans.flags[i] & 2 != 0)
+    if style.font and style.font not in re.sub(r'[^a-z]', '', font_name):
+        return False
+    if style.size and abs(spans.sizes[i] - style.size) > 0.5:
+        return False
+    return not style.bold or is_bold
+
+@instrumented('validate_pdf_style')
+def validate_pdf_style(spans, expected_text, style):
     expected_norm = normalize_text(expected_text)
-    style_req = style_requirements.lower()
-
-    required_font = None
-    required_bold = False
-    required_size = None
-
-    if "style:" in style_req:
-        required_font = style_req.split("style:")[1].split()[0].strip().lower()
-    if "bold" in style_req:
-        required_bold = True
-    if "size:" in style_req:
-        required_size = float(style_req.split("size:")[1].split()[0])
-
-    for page in doc:
-        spans = [span for block in page.get_text("dict")["blocks"]
-                      for line in block.get("lines", [])
-                      for span in line.get("spans", [])]
-        all_text = " ".join(span["text"] for span in spans)
-
-        if expected_norm in normalize_text(all_text):
-            for span in spans:
-                text = span["text"]
-                if normalize_text(text) in expected_norm:
-                    font_name = span.get("font", "").lower()
-                    font_size = span.get("size", 0)
-                    is_bold = "bold" in font_name or (span.get("flags", 0) & 2 != 0)
-
-                    font_match = size_match = bold_match = True
-
-                    if required_font and required_font not in re.sub(r'[^a-z]', '', font_name):
-                        font_match = False
-                    if required_size and abs(font_size - required_size) > 0.5:
-                        size_match = False
-                    if required_bold and not is_bold:
-                        bold_match = False
-
-                    if font_match and size_match and (not required_bold or bold_match):
+
+    for page, page_text in enumerate(spans.page_texts):
+        if expected_norm in page_text:
+            for i in spans.page_spans(page):
+                if spans.texts[i] in expected_norm:
+                    if _span_style_matches(spans, i, style):
                         return True, "Style matched"
                     else:
                         return False, "PDF style mismatch"
@@ -118,84 +211,541 @@ def validate_pdf_style(pdf_path, expected_text, style_requirements):
 
     return False, "Expected text not found in PDF"
 
-def evaluate_rule(rule_row, document_text, input_data, document_path):
-    input_val = rule_row.get('Input Value', '')
-    expected = rule_row['Output Language']
-    style_req = rule_row.get('Style', '').strip()
-    input_data_lower = {k.lower(): v for k, v in input_data.items()}
-    all_conditions = [cond.strip() for cond in re.split(r'\n|;', input_val) if cond.strip()]
-
-    for cond in all_conditions:
-        if '=' not in cond:
-            continue
-        key, val = cond.split('=', 1)
-        key = key.strip().lower()
-        expected_val = str(val).strip()
-        actual_val = input_data_lower.get(key, "")
-
+@instrumented('validate_pdf_style')
+def validate_located_pdf_style(spans, location, expected_norm, style):
+    # Only the spans under the match are candidates, so no page is searched.
+    for i in location.spans:
+        text = spans.texts[i]
+        if text and text in expected_norm:
+            if _span_style_matches(spans, i, style):
+                return True, "Style matched"
+            return False, "PDF style mismatch"
+    return False, "Text matched, no styled span matched"
+
+def _document_cache_path(digest, name):
+    key = cache_key(digest, os.path.splitext(name)[1].lower(), DOCUMENT_FORMAT_VERSION)
+    return os.path.join(DOCUMENT_CACHE_DIR, key + '.mwdoc')
+
+def _load_document(name, digest, read_pdf, read_word, use_cache):
+    # Extracted text and style indexes are cached by document content, so a
+    # document seen before never goes through PyMuPDF or python-docx again.
+    lower = name.lower()
+    if not lower.endswith(('.pdf', '.docx')):
+        raise ValueError("Unsupported document type")
+    if use_cache:
+        with stage('document_cache'):
+            cache_path = _document_cache_path(digest(), name)
+            document = load_cached_document(cache_path, name)
+        if document is not None:
+            return document
+
+    spans = paragraphs = None
+    if lower.endswith('.pdf'):
+        document_text, spans = read_pdf()
+    else:
+        document_text, paragraphs = read_word()
+    with stage('normalize', len(document_text)):
+        document = DocumentContext(name, document_text, spans, paragraphs)
+    if use_cache:
+        store_document(cache_path, document, DOCUMENT_CACHE_MAX_BYTES)
+    return document
+
+def load_document(doc_path, workers=None, use_cache=True):
+    return _load_document(doc_path, lambda: file_digest(doc_path), lambda: extract_pdf(doc_path, workers),
+                          lambda: extract_word(doc_path), use_cache)
+
+def load_document_data(data, name, use_cache=True, digest=None):
+    """``load_document`` for a document already read into memory; ``name``
+    gives its type and ``digest``, if known, its sha256 hex digest.
+    Extraction runs in the calling process."""
+    return _load_document(name, lambda: digest or hashlib.sha256(data).hexdigest(), lambda: extract_pdf_data(data),
+                          lambda: extract_word(io.BytesIO(data)), use_cache)
+
+class InputValues(dict):
+    """Normalized test-data values for condition checks, computed once per key."""
+
+    def __init__(self, input_data):
+        super().__init__()
+        self.raw = {k.lower(): v for k, v in input_data.items()}
+
+    def __missing__(self, key):
+        actual_val = self.raw.get(key, "")
         if isinstance(actual_val, dict):
             actual_val = list(actual_val.keys())[0] if actual_val else ""
-
-        expected_values = re.findall(r'"([^"]+)"', expected_val) or [v.strip() for v in expected_val.split(',')]
-        expected_values = [normalize_text(v) for v in expected_values]
-
         if isinstance(actual_val, list):
-            actual_norm_list = [normalize_text(str(v)) for v in actual_val]
-            if any(val not in actual_norm_list for val in expected_values):
-                return 'SKIPPED', f"List Mismatch for {key}"
+            value = [normalize_text(str(v)) for v in actual_val]
         else:
-            actual_norm = normalize_text(str(actual_val))
-            if actual_norm != expected_values[0]:
-                return 'SKIPPED', f"Condition Mismatch for {key}"
-
-    for key in re.findall(r"<(.*?)>", expected):
-        val = input_data.get(key, "")
-        if isinstance(val, dict):
-            val = list(val.values())[0] if val else ""
-        expected = expected.replace(f"<{key}>", str(val))
-
-    if normalize_text(expected) in normalize_text(document_text):
-        if style_req:
-            if document_path.lower().endswith('.docx'):
-                para, doc = find_paragraph_with_text(document_path, expected)
-                if para:
-                    style_ok, style_reason = validate_style(para, style_req, doc)
-                    if not style_ok:
-                        return 'FAIL', style_reason
-            elif document_path.lower().endswith('.pdf'):
-                style_ok, style_reason = validate_pdf_style(document_path, expected, style_req)
+            value = normalize_text(str(actual_val))
+        self[key] = value
+        return value
+
+def check_conditions(rule, values):
+    for cond in rule.conditions:
+        actual = values[cond.key]
+        if isinstance(actual, list):
+            if any(val not in actual for val in cond.values):
+                return 'SKIPPED', f"List Mismatch for {cond.key}"
+        elif actual != cond.values[0]:
+            return 'SKIPPED', f"Condition Mismatch for {cond.key}"
+    return None
+
+@instrumented('prefilter_conditions')
+def prefilter_conditions(plan, values):
+    """Evaluate every rule's conditions at once through the plan's index.
+
+    Returns a boolean mask of rules whose conditions all hold and a dict of
+    SKIPPED outcomes, carrying the same reasons as ``check_conditions``, for
+    the rest. The satisfied conditions are looked up per test-data key; the
+    cost of that grows with the matches, not with the rulebook.
+    """
+    applicable = np.ones(len(plan), dtype=bool)
+    n_conditions = len(plan.condition_rules)
+    if not n_conditions:
+        return applicable, {}
+
+    passed = np.zeros(n_conditions, dtype=bool)
+    list_keys = set()
+    for key, first_index in plan.first_index.items():
+        actual = values[key]
+        if isinstance(actual, list):
+            # A list condition holds when every expected value is present.
+            list_keys.add(key)
+            value_index = plan.value_index[key]
+            hits = [value_index[value] for value in set(actual) if value in value_index]
+            if hits:
+                rows, counts = np.unique(np.concatenate(hits), return_counts=True)
+                passed[rows[counts == plan.condition_sizes[rows]]] = True
+        else:
+            rows = first_index.get(actual)
+            if rows is not None:
+                passed[rows] = True
+
+    # Conditions are numbered in evaluation order, so the first failing one
+    # of each rule is the one check_conditions would have reported.
+    failed_rows = np.flatnonzero(~passed)
+    skipped_rules, first_rows = np.unique(plan.condition_rules[failed_rows], return_index=True)
+    applicable[skipped_rules] = False
+    keys = plan.condition_keys[failed_rows[first_rows]]
+    return applicable, {
+        rule: ('SKIPPED', f"List Mismatch for {key}" if key in list_keys else f"Condition Mismatch for {key}")
+        for rule, key in zip(skipped_rules.tolist(), keys.tolist())
+    }
+
+def render_expected(rule, input_data, cache=None):
+    """The rule's normalized expected text for ``input_data``, memoized in
+    ``cache`` (usually the plan's ``rendered``) when given."""
+    return rule.template.render(input_data, cache)
+
+def match_expected(rule, document, target, hits=None, locations=None):
+    # target is the normalized expected text and hits its match offsets in
+    # the normalized document; the first one within a single page or
+    # paragraph locates the style check. A match spanning pages or
+    # paragraphs falls back to searching for the text.
+    if hits is None:
+        pos = document.normalized.find(target)
+        hits = [pos] if pos != -1 else []
+    if not hits:
+        return 'FAIL', NOT_FOUND
+
+    location = document.locate(hits, len(target))
+    if locations is not None:
+        locations[rule.index] = location
+    if rule.style:
+        if document.kind == 'docx':
+            para = location.paragraph if location is not None else find_paragraph_with_text(document.paragraphs, target)
+            if para is not None:
+                style_ok, style_reason = validate_style(document.paragraphs.paragraph_runs(para), rule.style)
                 if not style_ok:
                     return 'FAIL', style_reason
+        elif document.kind == 'pdf':
+            if location is not None:
+                style_ok, style_reason = validate_located_pdf_style(document.spans, location, target, rule.style)
+            else:
+                style_ok, style_reason = validate_pdf_style(document.spans, target, rule.style)
+            if not style_ok:
+                return 'FAIL', style_reason
+    return 'PASS', "Validation passed"
+
+@instrumented('evaluate_rule', size=_document_size)
+def evaluate_rule(rule, document, input_data):
+    skipped = check_conditions(rule, InputValues(input_data))
+    if skipped:
+        return skipped
+    return match_expected(rule, document, render_expected(rule, input_data))
+
+def find_expected(plan, document, input_data, applicable, rule_times=None):
+    # Every applicable rule's expected text goes into one automaton so the
+    # document is scanned once rather than once per rule.
+    pending = []
+    matcher = MultiPatternMatcher()
+    for idx in np.flatnonzero(applicable).tolist():
+        rule = plan.rules[idx]
+        if rule_times is not None:
+            start = time.perf_counter()
+        target = render_expected(rule, input_data, plan.rendered)
+        matcher.add(rule.index, target)
+        pending.append((rule, target))
+        if rule_times is not None:
+            rule_times[idx] += time.perf_counter() - start
+
+    with stage('scan_document', len(document.normalized)):
+        hits = matcher.scan(document.normalized)
+    return [(rule, target, hits.get(rule.index, [])) for rule, target in pending]
+
+@instrumented('evaluate_rules', size=_document_size)
+def evaluate_rules(plan, document, input_data, rule_times=None, progress=None, cancel=None, locations=None):
+    """Evaluate every rule of ``plan``; when ``rule_times`` is a list it
+    receives the seconds spent on each rule's own rendering and checks, and
+    ``locations`` the Location of each rule's match (None if unmatched).
+
+    ``progress(done, total)`` is called as rules complete, and setting the
+    ``cancel`` event (anything with ``is_set()``) raises ValidationCancelled.
+    """
+    applicable, skipped = prefilter_conditions(plan, InputValues(input_data))
+    results = [None] * len(plan)
+    for idx, outcome in skipped.items():
+        results[idx] = outcome
+
+    matched = find_expected(plan, document, input_data, applicable, rule_times)
+    total = len(plan)
+    done = len(skipped)
+    step = max(1, total // PROGRESS_STEPS)
+    if progress is not None:
+        progress(done, total)
+    for rule, target, hits in matched:
+        done += 1
+        if done % step == 0:
+            check_cancelled(cancel)
+            if progress is not None:
+                progress(done, total)
+        if rule_times is None:
+            results[rule.index] = match_expected(rule, document, target, hits, locations)
+        else:
+            start = time.perf_counter()
+            results[rule.index] = match_expected(rule, document, target, hits, locations)
+            rule_times[rule.index] += time.perf_counter() - start
+    if progress is not None:
+        progress(total, total)
+
+    if active(logger):
+        expected_by_rule = {rule.index: target for rule, target, _ in matched}
+        for rule in plan:
+            status, reason = results[rule.index]
+            trace(logger, rule.identifier, "Rule %s: %s — %s (expected: %r)",
+                  rule.identifier, status, reason, expected_by_rule.get(rule.index))
+    return results
+
+SNIPPET_CHARS = 80
+
+@instrumented('near_matches', size=_document_size)
+def explain_failures(plan, document, input_data, outcomes, max_candidates=MAX_CANDIDATES):
+    """Add the closest passage and its similarity to the Reason of every
+    rule whose expected text was not found. Returns the updated outcomes.
+
+    The document's near-match index is built on first use and kept on it,
+    so records sharing a DocumentContext index it once.
+    """
+    index = None
+    for rule in plan:
+        if outcomes[rule.index] != ('FAIL', NOT_FOUND):
+            continue
+        if index is None:
+            index = document.near_match_index()
+        target = render_expected(rule, input_data, plan.rendered)
+        best = index.closest(target, max_candidates) if target else None
+        if best is None or best[0] < MIN_SCORE:
+            continue
+        score, start, end = best
+        snippet = document.normalized[start:end]
+        if len(snippet) > SNIPPET_CHARS:
+            snippet = snippet[:SNIPPET_CHARS - 3] + "..."
+        location = document.locate([start], end - start)
+        where = f" on {location}" if location is not None else ""
+        outcomes[rule.index] = ('FAIL', f'{NOT_FOUND}; closest match {score:.0%}{where}: "{snippet}"')
+    return outcomes
+
+def _stream_chunks(doc_path):
+    # (text, spans, runs) for each page or paragraph, the number of chunks,
+    # and the separator that joins consecutive chunk texts into the document text.
+    lower = doc_path.lower()
+    if lower.endswith('.pdf'):
+        with fitz.open(doc_path) as doc:
+            count = doc.page_count
+        return ((text, spans, None) for text, spans in iter_pdf_pages(doc_path)), count, ''
+    if lower.endswith('.docx'):
+        doc = docx.Document(doc_path)
+        return ((text, None, runs) for text, _, runs in _word_paragraphs(doc)), len(doc.paragraphs), '\n'
+    raise ValueError("Unsupported document type")
+
+def _streamed_style(rule, spans, runs, location, target):
+    if not rule.style:
         return 'PASS', "Validation passed"
+    if spans is None:
+        style_ok, style_reason = validate_style(runs, rule.style)
+    elif location is not None:
+        style_ok, style_reason = validate_located_pdf_style(spans, location, target, rule.style)
     else:
-        return 'FAIL', "Expected output not found"
-
-def load_rules(excel_path):
-    df = pd.read_excel(excel_path, engine='openpyxl')
+        style_ok, style_reason = validate_pdf_style(spans, target, rule.style)
+    return ('PASS', "Validation passed") if style_ok else ('FAIL', style_reason)
+
+@instrumented('evaluate_streaming', size=lambda result, plan, doc_path, *args, **kwargs: _path_size(result, doc_path))
+def evaluate_streaming(plan, doc_path, input_data, progress=None, cancel=None, locations=None):
+    """Evaluate every rule of ``plan`` reading ``doc_path`` one page (PDF) or
+    paragraph (DOCX) at a time, without building a DocumentContext.
+
+    The automaton's state carries over from chunk to chunk, so text running
+    across a page break is still found, while only the current chunk's text
+    and styles are held: for a PDF memory stays flat however long the
+    document is. python-docx still loads the whole DOCX package up front,
+    so for DOCX only the extracted text and runs are kept per paragraph.
+    A rule is settled by its first match lying within one chunk, style
+    checked against that chunk before it is dropped; an empty expected text
+    is checked against the first chunk. A styled PDF rule matched only
+    across pages fails as "Expected text not found in PDF"; other rules
+    matched only that way pass. ``progress(done, total)`` counts pages or
+    paragraphs read.
+    """
+    applicable, skipped = prefilter_conditions(plan, InputValues(input_data))
+    results = [None] * len(plan)
+    for idx, outcome in skipped.items():
+        results[idx] = outcome
+
+    matcher = MultiPatternMatcher()
+    targets = {}
+    for idx in np.flatnonzero(applicable).tolist():
+        target = render_expected(plan.rules[idx], input_data, plan.rendered)
+        matcher.add(idx, target)
+        targets[idx] = target
+    empty = [idx for idx, target in targets.items() if not target]
+    # Rules with some match that has not yet been settled within one chunk.
+    straddling = set(empty)
+    stream = matcher.stream()
+    chunks, total, separator = _stream_chunks(doc_path)
+    step = max(1, total // PROGRESS_STEPS)
+    raw_offset = 0
+    for number, (text, spans, runs) in enumerate(chunks):
+        check_cancelled(cancel)
+        if progress is not None and number % step == 0:
+            progress(number, total)
+        if number == 0:
+            # Empty expected text matches at the start, so as in
+            # match_expected its style is checked on the first page or paragraph.
+            for idx in empty:
+                results[idx] = _streamed_style(plan.rules[idx], spans, runs, None, '')
+            straddling.difference_update(empty)
+        normalized, offsets = normalize_with_offsets(text)
+        if normalized:
+            # Chunks are joined by whitespace, which normalizes to one space.
+            if stream.offset:
+                stream.feed(' ')
+            base = stream.offset
+            for idx, starts in stream.feed(normalized).items():
+                target = targets[idx]
+                if results[idx] is not None or not target:
+                    continue
+                start = next((start for start in starts if start >= base), None)
+                if start is None:
+                    straddling.add(idx)
+                    continue
+                raw_start, raw_end = offsets[start - base], offsets[start - base + len(target) - 1] + 1
+                if spans is not None:
+                    location = Location(raw_offset + raw_start, raw_offset + raw_end, page=number)
+                    chunk_location = Location(raw_start, raw_end, spans=spans.spans_between(raw_start, raw_end))
+                else:
+                    location = chunk_location = Location(raw_offset + raw_start, raw_offset + raw_end,
+                                                         paragraph=number)
+                results[idx] = _streamed_style(plan.rules[idx], spans, runs, chunk_location, target)
+                straddling.discard(idx)
+                if locations is not None:
+                    locations[idx] = location
+        raw_offset += len(text) + len(separator)
+    if progress is not None:
+        progress(total, total)
+
+    pdf = separator == ''
+    for idx in targets:
+        if results[idx] is None:
+            if idx not in straddling:
+                results[idx] = ('FAIL', NOT_FOUND)
+            elif pdf and plan.rules[idx].style:
+                results[idx] = ('FAIL', "Expected text not found in PDF")
+            else:
+                results[idx] = ('PASS', "Validation passed")
+    return results
+
+# Bump when rule outcomes could change for unchanged rules, inputs and documents.
+INCREMENTAL_VERSION = 3
+
+def rule_fingerprint(rule):
+    # Content only, not position: moving a row keeps its cached outcome.
+    return cache_key(rule.identifier, rule.conditions, rule.expected, rule.style)
+
+def rule_inputs(rule, values, input_data):
+    """The test-data values a rule's outcome depends on."""
+    return ([values[cond.key] for cond in rule.conditions],
+            [input_data.get(key, "") for key in rule.placeholders])
+
+def incremental_state_path(rule_path, doc_path):
+    key = cache_key(os.path.abspath(rule_path), os.path.abspath(doc_path))
+    return os.path.join(RULE_CACHE_DIR, f"run-{key}.pkl")
+
+def evaluate_incremental(plan, doc_path, input_data, state_path, rule_times=None, progress=None, cancel=None,
+                         locations=None):
+    """Evaluate ``plan`` reusing the previous run recorded at ``state_path``.
+
+    The state keeps every rule's outcome keyed by the rule's content and
+    the test-data values it references. Only rules whose key is new are
+    evaluated, against the document cache; a changed document invalidates all.
+    """
+    digest = file_digest(doc_path)
+    version = (INCREMENTAL_VERSION, PLAN_VERSION)
+    state = load_pickle(state_path)
+    if isinstance(state, dict) and state.get('version') == version and state.get('document_digest') == digest:
+        previous = state['results']
+    else:
+        previous = None
+
+    values = InputValues(input_data)
+    keys = [cache_key(rule_fingerprint(rule), rule_inputs(rule, values, input_data)) for rule in plan]
+    cached = previous or {}
+    entries = [cached.get(key) for key in keys]
+    outcomes = [entry[0] if entry else None for entry in entries]
+    found = [entry[1] if entry else None for entry in entries]
+    stale = [rule for rule in plan if entries[rule.index] is None]
+    logger.info("Incremental run: re-evaluating %d of %d rules", len(stale), len(plan))
+
+    if stale:
+        subset = RulePlan([CompiledRule(i, rule.identifier, rule.conditions, rule.expected, rule.template,
+                                        rule.style) for i, rule in enumerate(stale)])
+        subset_times = [0.0] * len(stale) if rule_times is not None else None
+        subset_locations = [None] * len(stale)
+        fresh = evaluate_rules(subset, load_document(doc_path), input_data, subset_times, progress, cancel,
+                               subset_locations)
+        for i, rule in enumerate(stale):
+            outcomes[rule.index] = fresh[i]
+            found[rule.index] = subset_locations[i]
+            if rule_times is not None:
+                rule_times[rule.index] = subset_times[i]
+    elif progress is not None:
+        progress(len(plan), len(plan))
+    if locations is not None:
+        locations[:] = found
+
+    if stale or previous is None:
+        store_pickle(state_path, {'version': version, 'document_digest': digest,
+                                  'results': dict(zip(keys, zip(outcomes, found)))}, RULE_CACHE_MAX_BYTES)
+    return outcomes
+
+def read_rules(excel_path, sheet_name=0):
+    df = pd.read_excel(excel_path, sheet_name=sheet_name, engine='openpyxl')
     df.columns = df.columns.str.strip()
-    return df
-
-def main(rule_path, doc_path, json_path, output_path):
-    rules_df = load_rules(rule_path)
+    return compile_rules(df)
+
+@instrumented('load_rules', size=_path_size)
+def load_rules(excel_path, sheet_name=0, use_cache=True):
+    # Compiled plans are cached keyed by the workbook's content hash, so an
+    # unchanged rulebook never goes through openpyxl again.
+    if not use_cache:
+        return read_rules(excel_path, sheet_name)
+    key = cache_key(file_digest(excel_path), repr(sheet_name), PLAN_VERSION)
+    cache_path = os.path.join(RULE_CACHE_DIR, key + '.pkl')
+    plan = load_pickle(cache_path)
+    if not isinstance(plan, RulePlan):
+        plan = read_rules(excel_path, sheet_name)
+        store_pickle(cache_path, plan, RULE_CACHE_MAX_BYTES)
+    return plan
+
+def unwrap_test_data(raw_data):
+    # Test data may come wrapped in a top-level "testData" object.
+    return raw_data.get("testData", raw_data)
+
+def load_test_data(json_path):
+    with open(json_path, 'r') as f:
+        return unwrap_test_data(json.load(f))
 
-    if doc_path.lower().endswith('.pdf'):
-        document_text = extract_text_from_pdf(doc_path)
-    elif doc_path.lower().endswith('.docx'):
-        document_text = extract_text_from_word(doc_path)
-    else:
-        raise ValueError("Unsupported document type")
+RESULT_COLUMNS = ["Output Identifier", "Status", "Reason"]
+TIMING_COLUMN = "Eval Time (ms)"
+LOCATION_COLUMN = "Location"
 
-    with open(json_path, 'r') as f:
-        raw_data = json.load(f)
-        input_data = raw_data.get("testData", raw_data)
-
-    results = []
-    for _, row in rules_df.iterrows():
-        result, reason = evaluate_rule(row, document_text, input_data, doc_path)
-        results.append({
-            "Output Identifier": row.get("Output Identifier"),
+def result_rows(plan, outcomes, rule_times=None, locations=None):
+    for rule in plan:
+        result, reason = outcomes[rule.index]
+        row = {
+            "Output Identifier": rule.identifier,
             "Status": result,
             "Reason": reason
-        })
-
-    pd.DataFrame(results).to_excel(output_path, index=False)
+        }
+        if locations is not None:
+            location = locations[rule.index]
+            row[LOCATION_COLUMN] = str(location) if location is not None else ""
+        if rule_times is not None:
+            row[TIMING_COLUMN] = round(rule_times[rule.index] * 1000, 3)
+        yield row
+
+def status_counts(outcomes):
+    counts = {'PASS': 0, 'FAIL': 0, 'SKIPPED': 0}
+    for status, _ in outcomes:
+        counts[status] += 1
+    return counts
+
+def _output_size(result, rows, output_path, *args, **kwargs):
+    paths = [output_path] if isinstance(output_path, str) else output_path
+    return sum(os.path.getsize(path) for path in paths)
+
+@instrumented('write_report', size=_output_size)
+def write_results(rows, output_path, summary=None, columns=RESULT_COLUMNS):
+    # output_path may be a list to write several formats (.xlsx, .csv,
+    # .jsonl) in one pass; rows are streamed and never held together.
+    sink = open_sinks(output_path, columns)
+    try:
+        for row in rows:
+            sink.write(row)
+    finally:
+        sink.close(summary)
+
+def main(rule_path, doc_path, json_path, output_path, profile=False, stats_path=None, rule_timings=False,
+         progress=None, cancel=None, incremental=False, near_matches=False, streaming=False):
+    # profile adds a Summary sheet of per-stage timings to the workbook,
+    # stats_path exports the same figures as JSON and rule_timings adds a
+    # per-rule "Eval Time (ms)" column. output_path may be a list of
+    # .xlsx/.csv/.jsonl paths, all written in the same pass. progress and
+    # cancel are passed to evaluate_rules; a cancelled run writes nothing.
+    # incremental reuses unchanged rules' outcomes from the previous run,
+    # kept in RULE_CACHE_DIR. near_matches adds the
+    # closest passage to the Reason of rules whose text was not found.
+    # streaming reads the document a page at a time for documents too large
+    # to hold in memory; it records no per-rule timings and keeps no
+    # incremental state, so it cannot be combined with rule_timings or
+    # incremental, and near_matches still loads the whole document.
+    if streaming and rule_timings:
+        raise ValueError("rule_timings is not supported with streaming")
+    if streaming and incremental:
+        raise ValueError("incremental is not supported with streaming")
+    stats = Stats() if profile or stats_path or rule_timings else None
+    with collecting(stats) if stats is not None else nullcontext():
+        plan = load_rules(rule_path)
+        check_cancelled(cancel)
+        input_data = load_test_data(json_path)
+
+        rule_times = [0.0] * len(plan) if rule_timings else None
+        locations = [None] * len(plan)
+        if incremental:
+            outcomes = evaluate_incremental(plan, doc_path, input_data, incremental_state_path(rule_path, doc_path),
+                                            rule_times, progress, cancel, locations)
+        elif streaming:
+            outcomes = evaluate_streaming(plan, doc_path, input_data, progress, cancel, locations)
+        else:
+            document = load_document(doc_path)
+            check_cancelled(cancel)
+            outcomes = evaluate_rules(plan, document, input_data, rule_times, progress, cancel, locations)
+        if near_matches and ('FAIL', NOT_FOUND) in outcomes:
+            if incremental or streaming:
+                document = load_document(doc_path)
+            outcomes = explain_failures(plan, document, input_data, outcomes)
+        columns = RESULT_COLUMNS + [LOCATION_COLUMN]
+        if rule_timings:
+            columns.append(TIMING_COLUMN)
+        write_results(result_rows(plan, outcomes, rule_times, locations), output_path, stats if profile else None,
+                      columns)
+    if stats_path:
+        stats.to_json(stats_path)
@@ -0,0 +1,308 @@
+import argparse
+import base64
+import hashlib
+import http.client
+import json
+import logging
+import os
+import socket
+import socketserver
+import statistics
+import sys
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from diagnostics import configure_logging
+from memory_cache import LRUCache
+from rules import (available_cores, evaluate_rules, load_document_data, load_rules, result_rows, status_counts,
+                   unwrap_test_data)
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_SUFFIXES = {'pdf': '.pdf', 'docx': '.docx'}
+
+REQUEST_STRINGS = ('rulebook', 'document', 'document_path', 'document_type')
+
+def check_request(request):
+    """Raise ValueError unless ``request`` has the shape validate() expects."""
+    if not isinstance(request, dict):
+        raise ValueError("request must be a JSON object")
+    for field in REQUEST_STRINGS:
+        if field in request and not isinstance(request[field], str):
+            raise ValueError(f"{field} must be a string")
+    if not isinstance(request.get('test_data', {}), dict):
+        raise ValueError("test_data must be a JSON object")
+
+class ValidationService:
+    """Compiled rulebooks and parsed documents kept warm between requests.
+
+    ``rulebooks`` maps the ids clients may use to workbook paths; no other
+    rulebook is served. Plans are keyed by path and modification time, so an
+    edited workbook is recompiled on next use. ``document_root`` is the only
+    folder ``document_path`` requests may read from; without it they are
+    rejected.
+
+    Requests run on a thread pool. That overlaps request I/O and the parts
+    of extraction PyMuPDF runs without the GIL, but rule evaluation holds
+    the GIL, so one server evaluates about one request at a time; run
+    several servers to use more cores.
+    """
+
+    def __init__(self, rulebooks=None, max_rulebooks=8, max_documents=32, workers=None, document_root=None):
+        self.rulebooks = dict(rulebooks or {})
+        self.document_root = os.path.realpath(document_root) if document_root else None
+        self.plans = LRUCache(max_rulebooks)
+        self.documents = LRUCache(max_documents)
+        self.pool = ThreadPoolExecutor(max_workers=workers or available_cores())
+
+    def plan(self, rulebook):
+        if rulebook not in self.rulebooks:
+            raise ValueError(f"Unknown rulebook: {rulebook}")
+        path = os.path.abspath(self.rulebooks[rulebook])
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = load_rules(path)
+            self.plans.put(key, plan)
+        return plan
+
+    def document(self, data, kind):
+        suffix = DOCUMENT_SUFFIXES.get(kind)
+        if suffix is None:
+            raise ValueError(f"Unsupported document type: {kind}")
+        key = hashlib.sha256(data).hexdigest()
+        document = self.documents.get(key)
+        if document is None:
+            # Extract in this thread: no process pool inside the server.
+            document = load_document_data(data, 'document' + suffix, digest=key)
+            self.documents.put(key, document)
+        return document
+
+    def document_file(self, path):
+        if self.document_root is None:
+            raise ValueError("document_path is not enabled on this server")
+        path = os.path.realpath(os.path.join(self.document_root, path))
+        if os.path.commonpath([path, self.document_root]) != self.document_root:
+            raise ValueError("document_path is outside the document root")
+        return path
+
+    def validate(self, request):
+        """Run one request dict and return its results.
+
+        The request names a ``rulebook`` and carries ``test_data`` plus either
+        ``document`` (base64 bytes, with ``document_type`` pdf/docx) or
+        ``document_path`` (a file under the server's document root).
+        """
+        check_request(request)
+        test_data = unwrap_test_data(request.get('test_data', {}))
+        if not isinstance(test_data, dict):
+            raise ValueError("test_data must be a JSON object")
+        start = time.perf_counter()
+        plan = self.plan(request['rulebook'])
+        if 'document_path' in request:
+            path = self.document_file(request['document_path'])
+            with open(path, 'rb') as f:
+                data = f.read()
+            kind = request.get('document_type') or os.path.splitext(path)[1].lstrip('.').lower()
+        else:
+            data = base64.b64decode(request['document'])
+            kind = request.get('document_type', 'pdf')
+        document = self.document(data, kind.lower())
+
+        outcomes = evaluate_rules(plan, document, test_data)
+        return {
+            "results": list(result_rows(plan, outcomes)),
+            "counts": status_counts(outcomes),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def submit(self, request):
+        return self.pool.submit(self.validate, request)
+
+    def stats(self):
+        return {"rulebooks": self.plans.stats(), "documents": self.documents.stats()}
+
+class ValidationHandler(BaseHTTPRequestHandler):
+    # POST /validate with a JSON request body; GET /health for cache stats.
+    service = None
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port) address.
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply(200, {"status": "ok", **self.service.stats()})
+        else:
+            self._reply(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != '/validate':
+            self._reply(404, {"error": "Not found"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError as e:
+            self._reply(400, {"error": f"Invalid JSON: {e}"})
+            return
+        try:
+            self._reply(200, self.service.submit(request).result())
+        except (KeyError, ValueError, OSError) as e:
+            self._reply(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            logger.exception("Validation failed")
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+def make_server(service, host='127.0.0.1', port=8765, unix_socket=None):
+    handler = type('Handler', (ValidationHandler,), {'service': service})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+def connection_for(url, timeout=None):
+    """``unix:/path/to.sock`` or ``http://host:port``."""
+    if url.startswith('unix:'):
+        return UnixHTTPConnection(url[len('unix:'):], timeout)
+    parts = urllib.parse.urlsplit(url)
+    return http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+
+def post_validate(url, request, timeout=None):
+    conn = connection_for(url, timeout)
+    try:
+        body = json.dumps(request).encode('utf-8')
+        conn.request('POST', '/validate', body, {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+def read_requests(jsonl_path):
+    """Yield replay requests from a JSONL file, resolving relative paths
+    against its directory and inlining ``test_data_path`` files."""
+    base = os.path.dirname(os.path.abspath(jsonl_path))
+    with open(jsonl_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            request = json.loads(line)
+            for field in ('document_path', 'rulebook'):
+                if field in request and not os.path.isabs(request[field]):
+                    candidate = os.path.join(base, request[field])
+                    if os.path.exists(candidate):
+                        request[field] = candidate
+            if 'test_data_path' in request:
+                with open(os.path.join(base, request.pop('test_data_path')), 'r') as td:
+                    request['test_data'] = json.load(td)
+            yield request
+
+def replay(url, requests, concurrency=4, repeat=1):
+    """Send every request ``repeat`` times with ``concurrency`` in flight and
+    return latency statistics in milliseconds."""
+    requests = list(requests) * repeat
+
+    def send(request):
+        start = time.perf_counter()
+        status, _ = post_validate(url, request)
+        return status, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(send, requests))
+    wall = time.perf_counter() - start
+    latencies = sorted(ms for _, ms in outcomes)
+    errors = sum(1 for status, _ in outcomes if status != 200)
+    if not latencies:
+        return {"requests": 0, "errors": 0}
+    return {
+        "requests": len(outcomes),
+        "errors": errors,
+        "throughput_per_s": round(len(outcomes) / wall, 2),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rule validation service with warm rulebook and document caches.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help="run the service")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--unix-socket', help="listen on this Unix socket instead of TCP")
+    serve.add_argument('--rulebook', action='append', default=[], metavar='ID=PATH',
+                       help="register a rulebook id and compile it at startup; only registered ids are served")
+    serve.add_argument('--document-root', default=None,
+                       help="folder document_path requests may read from (default: document_path is rejected)")
+    serve.add_argument('--max-rulebooks', type=int, default=8)
+    serve.add_argument('--max-documents', type=int, default=32)
+    serve.add_argument('--workers', type=int, default=None,
+                       help="request threads; evaluation holds the GIL, so more threads overlap I/O "
+                            "rather than use more cores (default: available cores)")
+    serve.add_argument('--log-level', default=None)
+
+    client = sub.add_parser('replay', help="replay a JSONL file of requests against a running service")
+    client.add_argument('requests', help="JSONL file, one validation request per line")
+    client.add_argument('--url', default='http://127.0.0.1:8765', help="http://host:port or unix:/path.sock")
+    client.add_argument('--concurrency', type=int, default=4)
+    client.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.command == 'replay':
+        print(json.dumps(replay(args.url, read_requests(args.requests), args.concurrency, args.repeat), indent=2))
+        return 0
+
+    configure_logging(args.log_level, default='INFO')
+    rulebooks = dict(entry.split('=', 1) for entry in args.rulebook)
+    service = ValidationService(rulebooks, args.max_rulebooks, args.max_documents, args.workers, args.document_root)
+    for rulebook_id in rulebooks:
+        service.plan(rulebook_id)
+    server = make_server(service, args.host, args.port, args.unix_socket)
+    logger.info("Listening on %s", args.unix_socket or f"http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.pool.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from gui_app import STARTUP_PROBE_ENV
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Launch-to-window budget in seconds, for both `python gui_app.py` and the
+# onedir build in dist/MatchWise.
+TARGET_SECONDS = 1.5
+
+def measure(command, repeat):
+    """Wall time of each launch, from spawning the process until the window
+    is up and the app exits, plus the app's own in-process figure."""
+    env = dict(os.environ, **{STARTUP_PROBE_ENV: '1'})
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - start
+        if result.returncode != 0:
+            raise SystemExit(f"{' '.join(command)} exited with {result.returncode}:\n{result.stderr.strip()}")
+        reported = None
+        for line in result.stdout.splitlines():
+            if line.startswith('startup '):
+                reported = float(line.split()[1].rstrip('s'))
+        runs.append((wall, reported))
+    return runs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how long the MatchWise window takes to appear.")
+    parser.add_argument('--exe', help="frozen build to launch (default: run gui_app.py from source)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--target', type=float, default=TARGET_SECONDS,
+                        help=f"fail when the median launch exceeds this many seconds (default: {TARGET_SECONDS})")
+    args = parser.parse_args(argv)
+
+    command = [args.exe] if args.exe else [sys.executable, os.path.join(HERE, 'gui_app.py')]
+    runs = measure(command, args.repeat)
+    walls = [wall for wall, _ in runs]
+    median = statistics.median(walls)
+    print(f"launches={len(runs)} min={min(walls):.3f}s median={median:.3f}s max={max(walls):.3f}s "
+          f"target={args.target:.3f}s")
+    reported = [value for _, value in runs if value is not None]
+    if reported:
+        print(f"in-process (after interpreter start): median={statistics.median(reported):.3f}s")
+    return 1 if median > args.target else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
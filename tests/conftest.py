@@ -0,0 +1,30 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench
+import rules
+
+@pytest.fixture(autouse=True)
+def private_caches(tmp_path, monkeypatch):
+    # Keep the suite away from the user's real plan and document caches.
+    monkeypatch.setattr(rules, 'DOCUMENT_CACHE_DIR', str(tmp_path / 'documents'))
+    monkeypatch.setattr(rules, 'RULE_CACHE_DIR', str(tmp_path / 'rules'))
+
+@pytest.fixture(scope='session')
+def corpus(tmp_path_factory):
+    """Synthetic rulebook, test data and the lines of a matching document,
+    written as both PDF and DOCX with bench.py's generators."""
+    rng = random.Random(7)
+    input_data = bench.synthetic_test_data(rng)
+    rules_df = bench.synthetic_rules(300, rng)
+    lines = bench.document_lines(rules_df, input_data, 6, rng)
+    directory = tmp_path_factory.mktemp('corpus')
+    paths = {'pdf': str(directory / 'doc.pdf'), 'docx': str(directory / 'doc.docx')}
+    bench.write_pdf(paths['pdf'], lines)
+    bench.write_docx(paths['docx'], lines)
+    return rules_df, input_data, lines, paths
@@ -0,0 +1,40 @@
+import pickle
+
+import pytest
+
+from document_cache import dump_document, load_cached_document
+from rules import load_document
+
+def columns(index, names):
+    return {name: list(getattr(index, name)) for name in names}
+
+SPAN_COLUMNS = ['starts', 'texts', 'fonts', 'sizes', 'flags', 'page_starts', 'page_offsets', 'page_texts']
+PARAGRAPH_COLUMNS = ['starts', 'texts', 'run_starts', 'runs']
+
+@pytest.mark.parametrize('kind', ['pdf', 'docx'])
+def test_round_trip(corpus, tmp_path, kind):
+    path = corpus[3][kind]
+    document = load_document(path, use_cache=False)
+    cache_path = tmp_path / 'doc.mwdoc'
+    cache_path.write_bytes(dump_document(document))
+    cached = load_cached_document(str(cache_path), path)
+
+    assert cached.text == document.text
+    assert cached.normalized == document.normalized
+    assert list(cached.offsets) == list(document.offsets)
+    if kind == 'pdf':
+        assert columns(cached.spans, SPAN_COLUMNS) == columns(document.spans, SPAN_COLUMNS)
+        assert cached.paragraphs is None
+    else:
+        assert columns(cached.paragraphs, PARAGRAPH_COLUMNS) == columns(document.paragraphs, PARAGRAPH_COLUMNS)
+        assert cached.spans is None
+    # Mapped columns are memoryviews; the context must still pickle.
+    copy = pickle.loads(pickle.dumps(cached))
+    assert list(copy.offsets) == list(document.offsets)
+
+def test_damaged_entries_are_ignored(tmp_path):
+    cache_path = tmp_path / 'doc.mwdoc'
+    for data in (b'', b'MWDOC\n', b'MWDOC\n\xff\xff\xff\xff\xff\xff\xff\x7f', b'not a cache entry'):
+        cache_path.write_bytes(data)
+        assert load_cached_document(str(cache_path), 'doc.pdf') is None
+    assert load_cached_document(str(tmp_path / 'missing.mwdoc'), 'doc.pdf') is None
@@ -0,0 +1,51 @@
+import pytest
+
+import rules
+from rule_plan import compile_rules
+from rules import evaluate_incremental, evaluate_rules, load_document
+
+@pytest.fixture
+def counted(monkeypatch):
+    # Record how many rules each evaluate_rules call is given.
+    sizes = []
+    evaluate = rules.evaluate_rules
+
+    def counting(plan, *args, **kwargs):
+        sizes.append(len(plan))
+        return evaluate(plan, *args, **kwargs)
+    monkeypatch.setattr(rules, 'evaluate_rules', counting)
+    return sizes
+
+def full_run(plan, doc_path, input_data):
+    locations = [None] * len(plan)
+    outcomes = evaluate_rules(plan, load_document(doc_path, use_cache=False), input_data, locations=locations)
+    return outcomes, [str(loc) if loc else None for loc in locations]
+
+def incremental_run(plan, doc_path, input_data, state_path):
+    locations = [None] * len(plan)
+    outcomes = evaluate_incremental(plan, doc_path, input_data, state_path, locations=locations)
+    return outcomes, [str(loc) if loc else None for loc in locations]
+
+@pytest.mark.parametrize('kind', ['pdf', 'docx'])
+def test_incremental_matches_full_run_after_edits(corpus, kind, tmp_path, counted):
+    rules_df, input_data, lines, paths = corpus
+    state_path = str(tmp_path / 'run.pkl')
+    plan = compile_rules(rules_df)
+
+    assert incremental_run(plan, paths[kind], input_data, state_path) == full_run(plan, paths[kind], input_data)
+    assert counted == [len(plan)]
+    assert incremental_run(plan, paths[kind], input_data, state_path) == full_run(plan, paths[kind], input_data)
+    assert counted == [len(plan)]
+
+    # Edit one rule's expected text to a line that is in the document.
+    edited_df = rules_df.copy()
+    edited_df.loc[0, "Output Language"] = lines[3]
+    edited_df.loc[0, "Style"] = ""
+    edited = compile_rules(edited_df)
+    assert incremental_run(edited, paths[kind], input_data, state_path) == full_run(edited, paths[kind], input_data)
+    assert counted[-1] == 1
+
+    # Edit test-data values referenced by templates and by conditions.
+    changed = dict(input_data, PolicyNumber="ZZ-000", ProductName="CRITICAL ILLNESS")
+    assert incremental_run(edited, paths[kind], changed, state_path) == full_run(edited, paths[kind], changed)
+    assert 0 < counted[-1] < len(edited)
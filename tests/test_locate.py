@@ -0,0 +1,89 @@
+import pandas as pd
+
+from document import DocumentContext, ParagraphIndex, SpanIndex
+from rule_plan import compile_rules
+from rules import LOCATION_COLUMN, evaluate_rules, result_rows
+
+PAGES = ["Alpha  Beta\nrepeat gamma", "Gamma delta\nrepeat gamma"]
+
+def page_dict(text):
+    return {"blocks": [{"lines": [{"spans": [{"text": line, "font": "Arial", "size": 10, "flags": 0}]}
+                                  for line in text.split("\n")]}]}
+
+def pdf_context():
+    spans = SpanIndex()
+    text = ""
+    for page in PAGES:
+        text += spans.add_page(page_dict(page), len(text))
+    return DocumentContext("doc.pdf", text, spans=spans)
+
+def docx_context():
+    paragraphs = ParagraphIndex()
+    text = ""
+    for page in PAGES:
+        for line in page.split("\n"):
+            paragraphs.add_paragraph(len(text), line, [("arial", 10.0, False)])
+            text += line + "\n"
+    return DocumentContext("doc.docx", text, paragraphs=paragraphs)
+
+def hits(document, target):
+    found, pos = [], document.normalized.find(target)
+    while pos != -1:
+        found.append(pos)
+        pos = document.normalized.find(target, pos + 1)
+    return found
+
+def test_locate_pdf_pages():
+    document = pdf_context()
+    location = document.locate(hits(document, "alpha beta"), len("alpha beta"))
+    assert (location.page, str(location)) == (0, "page 1")
+    assert document.text[location.start:location.end] == "Alpha  Beta"
+    assert [document.spans.texts[i] for i in location.spans] == ["alpha beta"]
+
+    location = document.locate(hits(document, "gamma delta"), len("gamma delta"))
+    assert str(location) == "page 2"
+    assert document.text[location.start:location.end] == "Gamma delta"
+
+    # The first match runs across the page break; the next one lies within page 2.
+    target = "repeat gamma gamma"
+    assert len(hits(document, target)) == 1
+    assert document.locate(hits(document, target), len(target)) is None
+    target = "repeat gamma"
+    assert str(document.locate(hits(document, target), len(target))) == "page 1"
+    assert document.locate([], 5) is None
+    assert document.locate([0], 0) is None
+
+def test_locate_docx_paragraphs():
+    document = docx_context()
+    location = document.locate(hits(document, "gamma delta"), len("gamma delta"))
+    assert (location.paragraph, str(location)) == (2, "paragraph 3")
+    assert document.text[location.start:location.end] == "Gamma delta"
+    target = "beta repeat"
+    assert document.locate(hits(document, target), len(target)) is None
+
+def test_locate_plain_text():
+    document = DocumentContext("doc.txt", "one two three")
+    location = document.locate([4], 3)
+    assert (location.start, location.end, str(location)) == (4, 7, "offset 4")
+
+def test_location_column():
+    plan = compile_rules(pd.DataFrame([
+        {"Output Identifier": "FIRST", "Input Value": "", "Output Language": "Alpha Beta", "Style": ""},
+        {"Output Identifier": "SECOND", "Input Value": "", "Output Language": "Gamma delta", "Style": "Size: 10"},
+        {"Output Identifier": "MISSING", "Input Value": "", "Output Language": "Epsilon", "Style": ""},
+    ]))
+    document = pdf_context()
+    locations = [None] * len(plan)
+    outcomes = evaluate_rules(plan, document, {}, locations=locations)
+    rows = list(result_rows(plan, outcomes, locations=locations))
+    assert [(row["Status"], row[LOCATION_COLUMN]) for row in rows] == \
+           [("PASS", "page 1"), ("PASS", "page 2"), ("FAIL", "")]
+    assert all(LOCATION_COLUMN not in row for row in result_rows(plan, outcomes))
+
+def test_paragraph_find():
+    paragraphs = docx_context().paragraphs
+    assert paragraphs.find("gamma delta") == 2
+    assert paragraphs.find("beta repeat") is None
+    paragraphs.add_paragraph(100, "Epsilon", [])
+    assert paragraphs.find("epsilon") == 4
+    assert ParagraphIndex().find("alpha") is None
@@ -0,0 +1,45 @@
+import random
+
+from matcher import MultiPatternMatcher
+
+def occurrences(text, pattern):
+    found = []
+    pos = text.find(pattern)
+    while pos != -1:
+        found.append(pos)
+        pos = text.find(pattern, pos + 1)
+    return found
+
+def random_case(rng):
+    text = ''.join(rng.choice('ab c') for _ in range(rng.randint(0, 80)))
+    patterns = [''.join(rng.choice('ab c') for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 8))]
+    matcher = MultiPatternMatcher()
+    for key, pattern in enumerate(patterns):
+        matcher.add(key, pattern)
+    expected = {key: occurrences(text, pattern) for key, pattern in enumerate(patterns)}
+    return text, matcher, {key: starts for key, starts in expected.items() if starts}
+
+def test_scan_matches_str_find():
+    rng = random.Random(0)
+    for _ in range(1000):
+        text, matcher, expected = random_case(rng)
+        assert matcher.scan(text) == expected
+
+def test_empty_pattern_matches_at_start():
+    matcher = MultiPatternMatcher()
+    matcher.add('empty', '')
+    matcher.add('b', 'b')
+    assert matcher.scan('abab') == {'empty': [0], 'b': [1, 3]}
+    assert matcher.scan('') == {'empty': [0]}
+
+def test_stream_finds_matches_across_chunks():
+    rng = random.Random(1)
+    for _ in range(1000):
+        text, matcher, expected = random_case(rng)
+        cuts = sorted(rng.sample(range(len(text) + 1), min(4, len(text) + 1)))
+        stream = matcher.stream()
+        found = {}
+        for start, end in zip([0] + cuts, cuts + [len(text)]):
+            for key, starts in stream.feed(text[start:end]).items():
+                found.setdefault(key, []).extend(starts)
+        assert {key: sorted(starts) for key, starts in found.items()} == expected
@@ -0,0 +1,85 @@
+import pickle
+
+import pandas as pd
+
+import document as document_module
+from document import DocumentContext, SpanIndex
+from near_match import MIN_SCORE, NearMatchIndex
+from rule_plan import compile_rules
+from rules import NOT_FOUND, evaluate_rules, explain_failures
+
+TEXT = ("the insured may cancel this policy at any time by written notice. "
+        "benefits are payable for a covered hospital stay of at least one day. "
+        "the policy ends on the date premiums are not paid.")
+
+def test_closest_finds_the_misspelled_passage():
+    index = NearMatchIndex(TEXT)
+    target = "benefits are payble for a coverd hospital stay"
+    score, start, end = index.closest(target)
+    assert MIN_SCORE < score < 1
+    assert TEXT[start:end] == "benefits are payable for a covered hospital stay"
+
+def test_closest_exact_and_missing():
+    index = NearMatchIndex(TEXT)
+    target = "the policy ends on the date"
+    score, start, end = index.closest(target)
+    assert (score, TEXT[start:end]) == (1.0, target)
+    assert index.closest("entirely unrelated words") is None
+    assert NearMatchIndex("").closest("anything") is None
+
+def test_closest_respects_max_candidates():
+    text = " ".join(f"alpha filler{i} beta" for i in range(50)) + " alpha gamma beta"
+    index = NearMatchIndex(text)
+    score, start, end = index.closest("alpha gamma beta", max_candidates=1)
+    assert (score, text[start:end]) == (1.0, "alpha gamma beta")
+
+def context(pages):
+    spans = SpanIndex()
+    text = ""
+    for page in pages:
+        lines = [{"spans": [{"text": page, "font": "Arial", "size": 10, "flags": 0}]}]
+        text += spans.add_page({"blocks": [{"lines": lines}]}, len(text))
+    return DocumentContext("doc.pdf", text, spans=spans)
+
+def test_explain_failures(monkeypatch):
+    built = []
+
+    class CountingIndex(NearMatchIndex):
+        def __init__(self, text):
+            built.append(text)
+            super().__init__(text)
+    monkeypatch.setattr(document_module, 'NearMatchIndex', CountingIndex)
+
+    plan = compile_rules(pd.DataFrame([
+        {"Output Identifier": "FOUND", "Input Value": "", "Output Language": "The insured may cancel", "Style": ""},
+        {"Output Identifier": "TYPO", "Input Value": "", "Style": "",
+         "Output Language": "Benefits are payble for a coverd <stay> stay"},
+        {"Output Identifier": "ABSENT", "Input Value": "", "Output Language": "Entirely unrelated words", "Style": ""},
+        {"Output Identifier": "SKIPPED", "Input Value": "ProductName=Other", "Output Language": "Benefit",
+         "Style": ""},
+    ]))
+    document = context(TEXT.split(". "))
+    input_data = {"stay": "hospital", "ProductName": "Accident"}
+    outcomes = evaluate_rules(plan, document, input_data)
+    assert [status for status, _ in outcomes] == ['PASS', 'FAIL', 'FAIL', 'SKIPPED']
+
+    explained = explain_failures(plan, document, input_data, list(outcomes))
+    assert explained[0] == outcomes[0] and explained[2:] == outcomes[2:]
+    status, reason = explained[1]
+    assert status == 'FAIL'
+    assert reason.startswith(f"{NOT_FOUND}; closest match ")
+    assert reason.endswith(' on page 2: "benefits are payable for a covered hospital stay"')
+
+    # The index is built once per document and not shipped when pickled.
+    explain_failures(plan, document, input_data, list(outcomes))
+    assert len(built) == 1
+    assert pickle.loads(pickle.dumps(document))._near_matches is None
+
+def test_explain_failures_without_failures(monkeypatch):
+    monkeypatch.setattr(document_module, 'NearMatchIndex', None)
+    plan = compile_rules(pd.DataFrame([
+        {"Output Identifier": "FOUND", "Input Value": "", "Output Language": "The insured may cancel", "Style": ""},
+    ]))
+    document = context([TEXT])
+    outcomes = evaluate_rules(plan, document, {})
+    assert explain_failures(plan, document, {}, list(outcomes)) == outcomes
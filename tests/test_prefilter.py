@@ -0,0 +1,55 @@
+import random
+
+import pandas as pd
+
+from rule_plan import compile_rules
+from rules import InputValues, check_conditions, prefilter_conditions
+
+KEYS = ['A', 'b', 'Cc']
+VALUES = ['x', 'y', 'Z z', 'w!']
+
+def random_plan(rng):
+    rows = []
+    for i in range(rng.randint(0, 12)):
+        conditions = []
+        for _ in range(rng.randint(0, 3)):
+            key = rng.choice(KEYS + ['x=y'])
+            if rng.random() < 0.3:
+                value = ', '.join(f'"{rng.choice(VALUES)}"' for _ in range(rng.randint(1, 3)))
+            else:
+                value = rng.choice(VALUES) + (', ' + rng.choice(VALUES) if rng.random() < 0.2 else '')
+            conditions.append(f"{key} = {value}")
+        if rng.random() < 0.1:
+            conditions.append("Static")
+        rows.append({"Output Identifier": f"R{i}", "Input Value": rng.choice(['\n', '; ']) + ';'.join(conditions),
+                     "Output Language": "x"})
+    return compile_rules(pd.DataFrame(rows, columns=["Output Identifier", "Input Value", "Output Language"]))
+
+def random_data(rng):
+    data = {}
+    for key in KEYS:
+        kind = rng.random()
+        if kind < 0.2:
+            continue
+        if kind < 0.5:
+            data[key] = [rng.choice(VALUES) for _ in range(rng.randint(0, 3))]
+        elif kind < 0.6:
+            data[key] = {rng.choice(VALUES): 1}
+        else:
+            data[key] = rng.choice(VALUES)
+    if rng.random() < 0.3:
+        data['a'] = rng.choice(VALUES)
+    return data
+
+def test_prefilter_matches_check_conditions():
+    rng = random.Random(0)
+    for _ in range(300):
+        plan = random_plan(rng)
+        data = random_data(rng)
+        applicable, skipped = prefilter_conditions(plan, InputValues(data))
+        for rule in plan:
+            expected = check_conditions(rule, InputValues(data))
+            if expected is None:
+                assert applicable[rule.index] and rule.index not in skipped
+            else:
+                assert not applicable[rule.index] and skipped[rule.index] == expected
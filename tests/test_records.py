@@ -0,0 +1,50 @@
+import io
+import json
+
+import pytest
+
+from records import iter_json_values, validate_records
+from rule_plan import compile_rules
+
+RECORDS = [{"document": "a.pdf", "note": "brackets ] [ and, commas"}, {"document": "b.docx", "n": [1, 2, {"x": "}"}]},
+           {}, {"document": "c.pdf", "text": "line\nbreak \"quoted\""}]
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 1 << 16])
+@pytest.mark.parametrize('layout', ['array', 'lines', 'concatenated'])
+def test_iter_json_values(layout, chunk_size):
+    if layout == 'array':
+        text = json.dumps(RECORDS, indent=1)
+    elif layout == 'lines':
+        text = '\n'.join(json.dumps(record) for record in RECORDS) + '\n'
+    else:
+        text = ''.join(json.dumps(record) for record in RECORDS)
+    assert list(iter_json_values(io.StringIO(text), chunk_size)) == RECORDS
+
+@pytest.mark.parametrize('text', ['', '[]', ' [ ] ', '\n\n'])
+def test_iter_json_values_empty(text):
+    assert list(iter_json_values(io.StringIO(text), 2)) == []
+
+def test_iter_json_values_reports_bad_json():
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_values(io.StringIO('{"a": 1}\n{"b": '), 4))
+
+class ListSink:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+
+def test_validate_records_reports_non_object_records(corpus):
+    rules_df, input_data, _, paths = corpus
+    plan = compile_rules(rules_df.head(20))
+    records = [[1], "x", None, dict(input_data, document=paths['pdf'], id="good")]
+    sink = ListSink()
+    counts = validate_records(plan, records, '.', sink, id_field='id')
+
+    errors = [row for row in sink.rows if row["Status"] == "ERROR"]
+    assert [(row["Record"], row["Document"]) for row in errors] == [(1, None), (2, None), (3, None)]
+    assert all("not an object" in row["Reason"] for row in errors)
+    assert counts['ERROR'] == 3
+    assert sum(counts.values()) == 3 + len(plan)
+    assert {row["Record"] for row in sink.rows if row["Status"] != "ERROR"} == {"good"}
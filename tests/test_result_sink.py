@@ -0,0 +1,58 @@
+import csv
+import json
+
+import pytest
+
+import result_sink
+from result_sink import open_sinks
+from rules import RESULT_COLUMNS, write_results
+
+class RecordingSink:
+    opened = []
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.closed = False
+        RecordingSink.opened.append(self)
+
+    def write(self, row):
+        pass
+
+    def close(self, summary=None):
+        self.closed = True
+
+@pytest.fixture
+def recording(monkeypatch):
+    RecordingSink.opened = []
+    monkeypatch.setitem(result_sink.SINKS, '.rec', RecordingSink)
+    return RecordingSink.opened
+
+def test_open_sinks_closes_opened_sinks_on_failure(recording, tmp_path):
+    with pytest.raises(ValueError, match="Unsupported output type"):
+        open_sinks([str(tmp_path / 'a.rec'), str(tmp_path / 'b.rec'), str(tmp_path / 'c.txt')], RESULT_COLUMNS)
+    assert [sink.closed for sink in recording] == [True, True]
+
+def test_multi_sink_closes_every_sink(recording, tmp_path, monkeypatch):
+    sink = open_sinks([str(tmp_path / 'a.rec'), str(tmp_path / 'b.rec')], RESULT_COLUMNS)
+
+    def failing_close(summary=None):
+        raise OSError("disk full")
+    monkeypatch.setattr(recording[0], 'close', failing_close)
+    with pytest.raises(OSError, match="disk full"):
+        sink.close()
+    assert recording[1].closed
+
+def test_write_results_closes_sinks_on_error(recording, tmp_path):
+    paths = [str(tmp_path / 'out.csv'), str(tmp_path / 'out.jsonl'), str(tmp_path / 'out.rec')]
+
+    def rows():
+        yield {"Output Identifier": "R1", "Status": "PASS", "Reason": "Validation passed"}
+        raise RuntimeError("evaluation failed")
+    with pytest.raises(RuntimeError, match="evaluation failed"):
+        write_results(rows(), paths)
+    assert recording[0].closed
+
+    with open(paths[0], newline='', encoding='utf-8') as f:
+        assert [row["Output Identifier"] for row in csv.DictReader(f)] == ["R1"]
+    with open(paths[1], encoding='utf-8') as f:
+        assert [json.loads(line)["Output Identifier"] for line in f] == ["R1"]
@@ -0,0 +1,46 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from service import ValidationService, make_server
+
+@pytest.fixture
+def server():
+    service = ValidationService({'main': 'Rules.xlsx'}, workers=1)
+    httpd = make_server(service, port=0)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+    service.pool.shutdown()
+
+def post(address, body):
+    connection = http.client.HTTPConnection(*address, timeout=10)
+    try:
+        connection.request('POST', '/validate', body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+@pytest.mark.parametrize('request_body', [
+    [1], "x", None, 3,
+    {"rulebook": "main", "document": "", "test_data": [1]},
+    {"rulebook": "main", "document": "", "test_data": "x"},
+    {"rulebook": "main", "document": "", "test_data": {"testData": [1]}},
+    {"rulebook": ["main"], "document": ""},
+    {"rulebook": "main", "document": 5},
+    {"rulebook": "main", "document": "", "document_type": 5},
+])
+def test_malformed_requests_are_rejected(server, request_body):
+    status, reply = post(server, json.dumps(request_body))
+    assert status == 400
+    assert reply["error"].startswith("ValueError: ")
+
+def test_invalid_json_is_rejected(server):
+    status, reply = post(server, '{"rulebook": ')
+    assert status == 400
+    assert reply["error"].startswith("Invalid JSON")
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from rule_plan import compile_rules
+from rules import evaluate_rules, evaluate_streaming, load_document, main
+
+def streaming_rules(rules_df, lines):
+    # Besides the synthetic rules: text running across the first page break,
+    # and empty expected text with and without a style.
+    straddling = ' '.join(lines[39].split()[-3:] + lines[40].split()[:3])
+    extra = pd.DataFrame([
+        {"Output Identifier": "ACROSS", "Input Value": "", "Output Language": straddling, "Style": ""},
+        {"Output Identifier": "ACROSS_STYLED", "Input Value": "", "Output Language": straddling,
+         "Style": "Style: Times Size: 10"},
+        {"Output Identifier": "EMPTY", "Input Value": "", "Output Language": "", "Style": ""},
+        {"Output Identifier": "EMPTY_STYLED", "Input Value": "", "Output Language": "", "Style": "Size: 10 Bold"},
+    ])
+    return compile_rules(pd.concat([rules_df, extra], ignore_index=True))
+
+@pytest.mark.parametrize('kind', ['pdf', 'docx'])
+def test_streaming_matches_evaluate_rules(corpus, kind):
+    rules_df, input_data, lines, paths = corpus
+    plan = streaming_rules(rules_df, lines)
+    expected_locations = [None] * len(plan)
+    expected = evaluate_rules(plan, load_document(paths[kind], use_cache=False), input_data,
+                              locations=expected_locations)
+    locations = [None] * len(plan)
+    progress = []
+    outcomes = evaluate_streaming(plan, paths[kind], input_data, lambda done, total: progress.append((done, total)),
+                                  locations=locations)
+
+    assert outcomes == expected
+    assert [(loc.start, loc.end, str(loc)) if loc else None for loc in locations] == \
+           [(loc.start, loc.end, str(loc)) if loc else None for loc in expected_locations]
+    assert progress[-1][0] == progress[-1][1]
+
+@pytest.mark.parametrize('option', ['rule_timings', 'incremental'])
+def test_streaming_rejects_unsupported_options(option):
+    with pytest.raises(ValueError, match=option):
+        main('rules.xlsx', 'doc.pdf', 'data.json', 'out.xlsx', streaming=True, **{option: True})
@@ -0,0 +1,43 @@
+import random
+import re
+
+import pandas as pd
+
+import rule_plan
+from document import normalize_text
+from rule_plan import Template, compile_rules
+
+def substituted(text, input_data):
+    # Output Language rendering before templates were compiled.
+    for key in re.findall(r"<(.*?)>", text):
+        value = input_data.get(key, "")
+        if isinstance(value, dict):
+            value = list(value.values())[0] if value else ""
+        text = text.replace(f"<{key}>", str(value))
+    return normalize_text(text)
+
+CHARS = ['a', 'B', ' ', '\n', '-', '.', '<', '>', '1', 'İ', '\t', '\x1c', '\xa0', 'é', 'Σ', ' ']
+PIECES = CHARS + ['<k1>', '<k2>', '<x>', '<missing>']
+
+def test_render_matches_substitution():
+    rng = random.Random(0)
+    for _ in range(20000):
+        text = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 12)))
+        data = {key: ''.join(rng.choice(CHARS) for _ in range(rng.randint(0, 4))) for key in ('k1', 'k2', 'x')}
+        if rng.random() < 0.2:
+            data['k1'] = {'v': data['k1']}
+        if rng.random() < 0.1:
+            data['k2'] = rng.choice([3, 1.5, None, {}])
+        template = Template(text)
+        assert template.render(data) == substituted(text, data), (text, data)
+
+def test_render_memo_is_bounded_per_plan(monkeypatch):
+    monkeypatch.setattr(rule_plan, 'RENDER_CACHE_SIZE', 16)
+    plan = compile_rules(pd.DataFrame([{"Output Identifier": f"R{i}", "Output Language": f"Rule {i % 5} <PolicyNumber>"}
+                                       for i in range(50)]))
+    assert len({id(rule.template) for rule in plan}) == 5
+    for number in range(100):
+        data = {"PolicyNumber": f"GAI{number}"}
+        for rule in plan:
+            assert rule.template.render(data, plan.rendered) == normalize_text(f"Rule {rule.index % 5} GAI{number}")
+    assert plan.rendered.stats()["entries"] <= 16